@@ -33,3 +33,10 @@ moonbit_maria_fs_stat_get_atime(moonbit_bytes_t buf) {
   struct stat *st = (struct stat *)buf;
   return (int64_t)st->st_atime;
 }
+
+MOONBIT_FFI_EXPORT
+int64_t
+moonbit_maria_fs_stat_get_size(moonbit_bytes_t buf) {
+  struct stat *st = (struct stat *)buf;
+  return (int64_t)st->st_size;
+}
@@ -29,16 +29,27 @@
 # Since this should not require frequent updates, we just store this
 # out-of-line and check the generated module into git.
 
+import argparse
+import bisect
+import dataclasses
 import enum
+import functools
+import hashlib
+import json
 import math
 import operator
 import os
 import re
+import shutil
+import subprocess
 import sys
+import tempfile
 import urllib.request
+from array import array
 from collections import defaultdict
+import itertools
 from itertools import batched
-from typing import Callable, Iterable
+from typing import Any, Callable, Iterable
 
 UNICODE_VERSION = "16.0.0"
 """The version of the Unicode data files to download."""
@@ -62,25 +73,140 @@ class OffsetType(enum.IntEnum):
     """Each offset is a single byte (u8)."""
 
 
+class TableFormat(enum.Enum):
+    """How the width lookup tables are written to the MoonBit module."""
+
+    BYTES = "bytes"
+    """Each table is one `Bytes` literal; sub-tables are stored back to back."""
+    ARRAY = "array"
+    """Each table is an `Array[UInt]`, or an `Array[Array[UInt]]` with one row per sub-table."""
+
+
 MODULE_PATH = "../tables.mbt"
 """The path of the emitted MoonBit module (relative to the working directory)"""
 
+TEST_MODULE_PATH = "../tables_test.mbt"
+"""The path of the emitted MoonBit test data, which only test builds compile (relative to the
+working directory)"""
+
+UCD_CACHE_DIR = ".ucd-cache"
+"""Where parsed Unicode data files are cached (relative to the working directory)"""
+
+MANIFEST_PATH = os.path.join(UCD_CACHE_DIR, "manifest.json")
+"""Records the inputs and outputs of the last run, so that outputs whose inputs have not changed
+are not generated again (relative to the working directory)"""
+
+SIZE_REPORT_PATH = os.path.join(UCD_CACHE_DIR, "table_sizes.json")
+"""Where the sizes of the generated tables are written as JSON, to compare them across Unicode
+versions and layout changes; like the rest of `UCD_CACHE_DIR` it is not committed (relative to
+the working directory)"""
+
+FORMATTER = ["moonfmt", "-w"]
+"""The command that formats each written module, if it is installed"""
+
+WIDTH_MAP_FILES = [
+    "DerivedCoreProperties.txt",
+    "EastAsianWidth.txt",
+    "HangulSyllableType.txt",
+    "LineBreak.txt",
+    "PropList.txt",
+    "UnicodeData.txt",
+    "auxiliary/GraphemeBreakProperty.txt",
+    "emoji/emoji-data.txt",
+    "extracted/DerivedGeneralCategory.txt",
+    "extracted/DerivedJoiningGroup.txt",
+]
+"""The files `load_width_maps` reads, which are all the width tables depend on"""
+
+MODULE_FILES = [
+    "ReadMe.txt",
+    *WIDTH_MAP_FILES,
+    "emoji/emoji-variation-sequences.txt",
+    "extracted/DerivedCombiningClass.txt",
+    "extracted/DerivedJoiningType.txt",
+]
+"""The files the module written to `MODULE_PATH` depends on"""
+
+TEST_MODULE_FILES = [
+    "NormalizationTest.txt",
+    "emoji-test.txt",
+    "extracted/DerivedGeneralCategory.txt",
+]
+"""The files the test data written to `TEST_MODULE_PATH` depends on"""
+
+EMOJI_FILES = ["emoji-test.txt"]
+"""The files fetched from the emoji directory of `https://www.unicode.org/Public/` rather than
+from the UCD"""
+
 TABLE_SPLITS = [7, 13]
-"""The splits between the bits of the codepoint used to index each subtable.
-Adjust these values to change the sizes of the subtables"""
+"""The splits between the bits of the codepoint used to index each subtable, in increasing
+order. Adjust these values (or run `unicode.py --search`) to change the sizes and the number of
+the subtables"""
+
+TABLE_OFFSET_TYPES = [OffsetType.U8, OffsetType.U8]
+"""The offset type of each table above the leaves, starting from the root. The leaves always
+store 2-bit widths."""
 
 Codepoint = int
 BitPos = int
 
 
-def fetch_open(filename: str, local_prefix: str = "", emoji: bool = False):
+@dataclasses.dataclass(frozen=True)
+class TableLayout:
+    """The shape of the multi-level width lookup table. The root table is indexed by the
+    codepoint bits above `splits[-1]`, each middle table by the bits between two adjacent
+    splits, and the leaves by the bits below `splits[0]`. `offset_types[i]` is the offset type
+    of the `i`th table from the root."""
+
+    splits: tuple[BitPos, ...]
+    offset_types: tuple[OffsetType, ...]
+
+    def levels(self) -> list[tuple[str, BitPos, BitPos, OffsetType]]:
+        """Returns the name, bit range and offset type of each table, starting from the root."""
+        bounds = [0, *self.splits, MAX_CODEPOINT_BITS]
+        offset_types = [*self.offset_types, OffsetType.U2]
+        levels = []
+        for i in range(len(bounds) - 1):
+            if i == 0:
+                name = "WIDTH_LEAVES"
+            elif i == len(bounds) - 2:
+                name = "WIDTH_ROOT"
+            elif len(bounds) == 4:
+                name = "WIDTH_MIDDLE"
+            else:
+                name = f"WIDTH_MIDDLE_{len(bounds) - 2 - i}"
+            levels.append((name, bounds[i], bounds[i + 1], offset_types[-1 - i]))
+        return levels[::-1]
+
+    def lookup_cost(self) -> float:
+        """Estimated cost of a lookup: one dependent read per table, plus half a read for every
+        table whose entries need to be unpacked from a byte."""
+        return sum(
+            1.0 if offset_type == OffsetType.U8 else 1.5
+            for _, _, _, offset_type in self.levels()
+        )
+
+    def __str__(self) -> str:
+        splits = ", ".join(map(str, self.splits))
+        offset_types = ", ".join(offset_type.name for offset_type in self.offset_types)
+        return f"splits [{splits}], offsets [{offset_types}]"
+
+
+TABLE_LAYOUT = TableLayout(tuple(TABLE_SPLITS), tuple(TABLE_OFFSET_TYPES))
+
+LATIN1_END = 0x100
+"""Codepoints below this have their widths stored one per byte in a table indexed directly by
+the codepoint, so that looking them up does not walk the multi-level tables."""
+
+
+def fetch_open(filename: str, local_prefix: str = ""):
     """Opens `filename` and return its corresponding file object. If `filename` isn't on disk,
     fetches it from `https://www.unicode.org/Public/`. Exits with code 1 on failure.
     """
     basename = os.path.basename(filename)
     localname = os.path.join(local_prefix, basename)
     if not os.path.exists(localname):
-        if emoji:
+        if filename in EMOJI_FILES:
             prefix = f"emoji/{UNICODE_VERSION[:-2]}"
         else:
             prefix = f"{UNICODE_VERSION}/ucd"
@@ -102,23 +228,117 @@ def load_unicode_version() -> tuple[int, int, int]:
         return tuple(map(int, re.search(pattern, readme.read()).groups()))  # type: ignore
 
 
+@functools.cache
+def file_digest(filename: str) -> bytes:
+    "Returns the SHA-256 hash of `filename`, fetching it if needed."
+    with fetch_open(filename) as file:
+        return hashlib.sha256(file.read().encode()).digest()
+
+
+@functools.cache
+def generator_digest() -> bytes:
+    "Returns the SHA-256 hash of this script, so that nothing it computed before a change is reused."
+    with open(__file__, "rb") as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def inputs_digest(filenames: list[str], key: str = "") -> str:
+    "Returns a hash of `UNICODE_VERSION`, this script, `key` and the content of `filenames`."
+    digest = hashlib.sha256(UNICODE_VERSION.encode())
+    digest.update(generator_digest())
+    digest.update(key.encode())
+    for filename in filenames:
+        digest.update(file_digest(filename))
+    return digest.hexdigest()
+
+
+def write_json(path: str, value: Any, indent: int | None = None):
+    "Writes `value` to `path` as JSON, atomically."
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so that an interrupted run leaves no partial file.
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(value, file, indent=indent)
+        if indent is not None:
+            file.write("\n")
+    os.replace(temporary, path)
+
+
+def cached(
+    name: str, filenames: list[str], parse: Callable[[], Any], key: str = ""
+) -> Any:
+    """Returns `parse()`, which must be JSON-serializable and only depend on the content of
+    `filenames` and on `key`. Results are cached in `UCD_CACHE_DIR`, keyed by `inputs_digest`, so
+    that repeated runs of the generator skip parsing the files and building tables again."""
+    path = os.path.join(UCD_CACHE_DIR, f"{name}-{inputs_digest(filenames, key)[:16]}.json")
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        pass
+    result = parse()
+    write_json(path, result)
+    return result
+
+
+@functools.cache
+def load_ranges(filename: str) -> dict[str, list[tuple[Codepoint, Codepoint]]]:
+    """Indexes a UCD property file in one pass. Returns the inclusive codepoint ranges of each
+    property value, in file order. For example, `"0041..005A ; Lu # ..."` adds `(0x41, 0x5A)`
+    to the ranges of `"Lu"`."""
+
+    def parse() -> dict[str, list[tuple[Codepoint, Codepoint]]]:
+        line_pattern = re.compile(
+            r"^([0-9A-F]+)(?:\.\.([0-9A-F]+))?\s*;\s*([^#]*?)\s*(?:#|$)"
+        )
+        ranges = defaultdict(list)
+        with fetch_open(filename) as properties:
+            for line in properties:
+                if match := line_pattern.match(line):
+                    low = int(match.group(1), 16)
+                    high = int(match.group(2), 16) if match.group(2) else low
+                    ranges[match.group(3)].append((low, high))
+        return ranges
+
+    name = os.path.splitext(os.path.basename(filename))[0]
+    ranges = cached(name, [filename], parse)
+    return {
+        value: [(low, high) for low, high in value_ranges]
+        for value, value_ranges in ranges.items()
+    }
+
+
+def load_property_ranges(
+    filename: str, pattern: str
+) -> list[tuple[Codepoint, Codepoint]]:
+    """Returns the sorted, inclusive codepoint ranges of `filename` whose property value
+    matches `pattern`."""
+    value_pattern = re.compile(pattern)
+    ranges = []
+    for value, value_ranges in load_ranges(filename).items():
+        if value_pattern.fullmatch(value):
+            ranges.extend(value_ranges)
+    ranges.sort()
+    return ranges
+
+
 def load_property(filename: str, pattern: str, action: Callable[[int], None]):
-    with fetch_open(filename) as properties:
-        single = re.compile(rf"^([0-9A-F]+)\s*;\s*{pattern}\s+")
-        multiple = re.compile(rf"^([0-9A-F]+)\.\.([0-9A-F]+)\s*;\s*{pattern}\s+")
+    for low, high in load_property_ranges(filename, pattern):
+        for cp in range(low, high + 1):
+            action(cp)
 
-        for line in properties.readlines():
-            raw_data = None  # (low, high)
-            if match := single.match(line):
-                raw_data = (match.group(1), match.group(1))
-            elif match := multiple.match(line):
-                raw_data = (match.group(1), match.group(2))
-            else:
-                continue
-            low = int(raw_data[0], 16)
-            high = int(raw_data[1], 16)
-            for cp in range(low, high + 1):
-                action(cp)
+
+def fill(byte_map: array, low: Codepoint, high: Codepoint, value: int):
+    "Sets `byte_map[low..=high]` to `value` with a single slice assignment."
+    byte_map[low : high + 1] = array("B", [value]) * (high - low + 1)
+
+
+def translate(byte_map: array, low: Codepoint, high: Codepoint, table: bytes):
+    "Maps every value in `byte_map[low..=high]` through the 256-byte `table`."
+    byte_map[low : high + 1] = array(
+        "B", byte_map[low : high + 1].tobytes().translate(table)
+    )
 
 
 def to_sorted_ranges(iter: Iterable[Codepoint]) -> list[tuple[Codepoint, Codepoint]]:
@@ -396,9 +616,58 @@ class WidthState(enum.IntEnum):
 
 assert len(set([v.value for v in WidthState])) == len([v.value for v in WidthState])
 
+WIDTH_STATES = list(WidthState)
+"""Every `WidthState`, indexed by its code in a width map. `WidthState` values do not fit in a
+byte, so width maps store these indices instead."""
+
+assert len(WIDTH_STATES) <= 256
+
+WIDTH_STATE_CODES = {state: code for code, state in enumerate(WIDTH_STATES)}
+"""The code of each `WidthState` in a width map."""
+
+WidthMap = array
+"""An `array("B")` of `NUM_CODEPOINTS` codes, indexed by codepoint. A width map takes about
+1.1 MB and is filled with slice assignments over codepoint ranges."""
+
+
+def width_state_table(f: Callable[[WidthState], int]) -> bytes:
+    "Returns a `bytes.translate` table mapping each width map code `c` to `f(WIDTH_STATES[c])`."
+    return bytes(f(state) for state in WIDTH_STATES) + bytes(256 - len(WIDTH_STATES))
+
+
+def load_stroke_decompositions() -> list[tuple[Codepoint, Codepoint]]:
+    """Returns the `(composed, decomposed)` pairs of `UnicodeData.txt` whose decomposition is
+    `decomposed` followed by U+0338 COMBINING LONG SOLIDUS OVERLAY."""
 
-def load_east_asian_widths() -> list[EastAsianWidth]:
-    """Return a list of effective widths, indexed by codepoint.
+    def parse() -> list[tuple[Codepoint, Codepoint]]:
+        single = re.compile(r"([0-9A-Z]+);.*?;.*?;.*?;.*?;([0-9A-Z]+) 0338;")
+        with fetch_open("UnicodeData.txt") as udata:
+            return [
+                (int(match.group(1), 16), int(match.group(2), 16))
+                for line in udata
+                if (match := single.match(line))
+            ]
+
+    return cached("UnicodeData-stroke", ["UnicodeData.txt"], parse)
+
+
+def load_decompositions() -> list[tuple[Codepoint, list[Codepoint]]]:
+    "Returns the `(composed, decomposed)` pairs of `UnicodeData.txt`."
+
+    def parse() -> list[tuple[Codepoint, list[Codepoint]]]:
+        single = re.compile(r"([0-9A-Z]+);.*?;.*?;.*?;.*?;([0-9A-F ]+);")
+        with fetch_open("UnicodeData.txt") as udata:
+            return [
+                (int(match.group(1), 16), [int(c, 16) for c in match.group(2).split(" ")])
+                for line in udata
+                if (match := single.match(line))
+            ]
+
+    return cached("UnicodeData-decompositions", ["UnicodeData.txt"], parse)
+
+
+def load_east_asian_widths() -> array:
+    """Return an `array("B")` of effective widths, indexed by codepoint.
     Widths are determined by fetching and parsing `EastAsianWidth.txt`.
 
     `Neutral`, `Narrow`, and `Halfwidth` characters are assigned `EffectiveWidth.NARROW`.
@@ -407,79 +676,46 @@ def load_east_asian_widths() -> list[EastAsianWidth]:
 
     `Ambiguous` characters are assigned `EffectiveWidth.AMBIGUOUS`."""
 
-    with fetch_open("EastAsianWidth.txt") as eaw:
-        # matches a width assignment for a single codepoint, i.e. "1F336;N  # ..."
-        single = re.compile(r"^([0-9A-F]+)\s*;\s*(\w+) +# (\w+)")
-        # matches a width assignment for a range of codepoints, i.e. "3001..3003;W  # ..."
-        multiple = re.compile(r"^([0-9A-F]+)\.\.([0-9A-F]+)\s*;\s*(\w+) +# (\w+)")
-        # map between width category code and condensed width
-        width_codes = {
-            **{c: EastAsianWidth.NARROW for c in ["N", "Na", "H"]},
-            **{c: EastAsianWidth.WIDE for c in ["W", "F"]},
-            "A": EastAsianWidth.AMBIGUOUS,
-        }
-
-        width_map = []
-        current = 0
-        for line in eaw.readlines():
-            raw_data = None  # (low, high, width)
-            if match := single.match(line):
-                raw_data = (match.group(1), match.group(1), match.group(2))
-            elif match := multiple.match(line):
-                raw_data = (match.group(1), match.group(2), match.group(3))
-            else:
-                continue
-            low = int(raw_data[0], 16)
-            high = int(raw_data[1], 16)
-            width = width_codes[raw_data[2]]
-
-            assert current <= high
-            while current <= high:
-                # Some codepoints don't fall into any of the ranges in EastAsianWidth.txt.
-                # All such codepoints are implicitly given Neural width (resolves to narrow)
-                width_map.append(EastAsianWidth.NARROW if current < low else width)
-                current += 1
+    # map between width category code and condensed width
+    width_codes = {
+        **{c: EastAsianWidth.NARROW for c in ["N", "Na", "H"]},
+        **{c: EastAsianWidth.WIDE for c in ["W", "F"]},
+        "A": EastAsianWidth.AMBIGUOUS,
+    }
 
-        while len(width_map) < NUM_CODEPOINTS:
-            # Catch any leftover codepoints and assign them implicit Neutral/narrow width.
-            width_map.append(EastAsianWidth.NARROW)
+    # Some codepoints don't fall into any of the ranges in EastAsianWidth.txt.
+    # All such codepoints are implicitly given Neural width (resolves to narrow)
+    width_map = array("B", [EastAsianWidth.NARROW]) * NUM_CODEPOINTS
+    for code, ranges in load_ranges("EastAsianWidth.txt").items():
+        width = width_codes[code]
+        for low, high in ranges:
+            fill(width_map, low, high, width)
 
     # Characters with ambiguous line breaking are ambiguous
-    load_property(
-        "LineBreak.txt",
-        "AI",
-        lambda cp: (operator.setitem(width_map, cp, EastAsianWidth.AMBIGUOUS)),
-    )
+    for low, high in load_property_ranges("LineBreak.txt", "AI"):
+        fill(width_map, low, high, EastAsianWidth.AMBIGUOUS)
 
     # Ambiguous `Letter`s and `Modifier_Symbol`s are narrow
-    load_property(
-        "extracted/DerivedGeneralCategory.txt",
-        r"(:?Lu|Ll|Lt|Lm|Lo|Sk)",
-        lambda cp: (
-            operator.setitem(width_map, cp, EastAsianWidth.NARROW)
-            if width_map[cp] == EastAsianWidth.AMBIGUOUS
-            else None
-        ),
-    )
+    ambiguous_to_narrow = bytearray(range(256))
+    ambiguous_to_narrow[EastAsianWidth.AMBIGUOUS] = EastAsianWidth.NARROW
+    for low, high in load_property_ranges(
+        "extracted/DerivedGeneralCategory.txt", r"(:?Lu|Ll|Lt|Lm|Lo|Sk)"
+    ):
+        translate(width_map, low, high, bytes(ambiguous_to_narrow))
 
     # GREEK ANO TELEIA: NFC decomposes to U+00B7 MIDDLE DOT
     width_map[0x0387] = EastAsianWidth.AMBIGUOUS
 
     # Canonical equivalence for symbols with stroke
-    with fetch_open("UnicodeData.txt") as udata:
-        single = re.compile(r"([0-9A-Z]+);.*?;.*?;.*?;.*?;([0-9A-Z]+) 0338;")
-        for line in udata.readlines():
-            if match := single.match(line):
-                composed = int(match.group(1), 16)
-                decomposed = int(match.group(2), 16)
-                if width_map[decomposed] == EastAsianWidth.AMBIGUOUS:
-                    width_map[composed] = EastAsianWidth.AMBIGUOUS
+    for composed, decomposed in load_stroke_decompositions():
+        if width_map[decomposed] == EastAsianWidth.AMBIGUOUS:
+            width_map[composed] = EastAsianWidth.AMBIGUOUS
 
     return width_map
 
 
-def load_zero_widths() -> list[bool]:
-    """Returns a list `l` where `l[c]` is true if codepoint `c` is considered a zero-width
+def load_zero_widths() -> array:
+    """Returns an `array("B")` `l` where `l[c]` is 1 if codepoint `c` is considered a zero-width
     character. `c` is considered a zero-width character if
 
     - it has the `Default_Ignorable_Code_Point` property (determined from `DerivedCoreProperties.txt`),
@@ -488,7 +724,7 @@ def load_zero_widths() -> list[bool]:
     - or if it has a `Hangul_Syllable_Type` of `Vowel_Jamo` or `Trailing_Jamo` (determined from `HangulSyllableType.txt`).
     """
 
-    zw_map = [False] * NUM_CODEPOINTS
+    zw_map = array("B", bytes(NUM_CODEPOINTS))
 
     # `Default_Ignorable_Code_Point`s also have 0 width:
     # https://www.unicode.org/faq/unsup_char.html#3
@@ -497,11 +733,11 @@ def load_zero_widths() -> list[bool]:
     # `Grapheme_Extend` includes characters with general category `Mn` or `Me`,
     # as well as a few `Mc` characters that need to be included so that
     # canonically equivalent sequences have the same width.
-    load_property(
+    for low, high in load_property_ranges(
         "DerivedCoreProperties.txt",
         r"(?:Default_Ignorable_Code_Point|Grapheme_Extend)",
-        lambda cp: operator.setitem(zw_map, cp, True),
-    )
+    ):
+        fill(zw_map, low, high, True)
 
     # Treat `Hangul_Syllable_Type`s of `Vowel_Jamo` and `Trailing_Jamo`
     # as zero-width. This matches the behavior of glibc `wcwidth`.
@@ -513,11 +749,8 @@ def load_zero_widths() -> list[bool]:
     # and the resulting grapheme has width 2.
     #
     # (See the Unicode Standard sections 3.12 and 18.6 for more on Hangul)
-    load_property(
-        "HangulSyllableType.txt",
-        r"(?:V|T)",
-        lambda cp: operator.setitem(zw_map, cp, True),
-    )
+    for low, high in load_property_ranges("HangulSyllableType.txt", r"(?:V|T)"):
+        fill(zw_map, low, high, True)
 
     # Syriac abbreviation mark:
     # Zero-width `Prepended_Concatenation_Mark`
@@ -563,30 +796,29 @@ def load_zero_widths() -> list[bool]:
     return zw_map
 
 
-def load_width_maps() -> tuple[list[WidthState], list[WidthState]]:
+def load_width_maps() -> tuple[WidthMap, WidthMap]:
     """Load complete width table, including characters needing special handling.
     (Returns 2 tables, one for East Asian and one for not.)"""
 
     eaws = load_east_asian_widths()
     zws = load_zero_widths()
 
-    not_ea = []
-    ea = []
-
-    for eaw, zw in zip(eaws, zws):
-        if zw:
-            not_ea.append(WidthState.ZERO)
-            ea.append(WidthState.ZERO)
-        else:
-            if eaw == EastAsianWidth.WIDE:
-                not_ea.append(WidthState.WIDE)
-            else:
-                not_ea.append(WidthState.NARROW)
-
-            if eaw == EastAsianWidth.NARROW:
-                ea.append(WidthState.NARROW)
-            else:
-                ea.append(WidthState.WIDE)
+    # Combine both maps into one byte per codepoint, `eaw | zw << 2`, and map that
+    # to the width state codes of each table.
+    zero_width_bit = bytes([0, 4]) + bytes(254)
+    keys = bytes(map(operator.or_, eaws, zws.tobytes().translate(zero_width_bit)))
+    not_ea_codes = bytearray(256)
+    ea_codes = bytearray(256)
+    for eaw in EastAsianWidth:
+        not_ea_codes[eaw | 4] = ea_codes[eaw | 4] = WIDTH_STATE_CODES[WidthState.ZERO]
+        not_ea_codes[eaw] = WIDTH_STATE_CODES[
+            WidthState.WIDE if eaw == EastAsianWidth.WIDE else WidthState.NARROW
+        ]
+        ea_codes[eaw] = WIDTH_STATE_CODES[
+            WidthState.NARROW if eaw == EastAsianWidth.NARROW else WidthState.WIDE
+        ]
+    not_ea = array("B", keys.translate(not_ea_codes))
+    ea = array("B", keys.translate(ea_codes))
 
     # Joining_Group=Alef (Arabic Lam-Alef ligature)
     alef_joining = []
@@ -649,17 +881,18 @@ def load_width_maps() -> tuple[list[WidthState], list[WidthState]]:
         (emoji_modifiers, WidthState.EMOJI_MODIFIER),
         (regional_indicators, WidthState.REGIONAL_INDICATOR),
     ]:
+        code = WIDTH_STATE_CODES[width]
         for cp in cps:
-            not_ea[cp] = width
-            ea[cp] = width
+            not_ea[cp] = code
+            ea[cp] = code
 
     # East-Asian only
-    ea[0xFE00] = WidthState.VARIATION_SELECTOR_1_OR_2
-    ea[0x0338] = WidthState.COMBINING_LONG_SOLIDUS_OVERLAY
+    ea[0xFE00] = WIDTH_STATE_CODES[WidthState.VARIATION_SELECTOR_1_OR_2]
+    ea[0x0338] = WIDTH_STATE_CODES[WidthState.COMBINING_LONG_SOLIDUS_OVERLAY]
 
     # Not East Asian only
-    not_ea[0xFE01] = WidthState.VARIATION_SELECTOR_1_OR_2
-    not_ea[0xFE0E] = WidthState.VARIATION_SELECTOR_15
+    not_ea[0xFE01] = WIDTH_STATE_CODES[WidthState.VARIATION_SELECTOR_1_OR_2]
+    not_ea[0xFE0E] = WIDTH_STATE_CODES[WidthState.VARIATION_SELECTOR_15]
 
     return (not_ea, ea)
 
@@ -677,13 +910,16 @@ def load_joining_group_lam() -> list[tuple[Codepoint, Codepoint]]:
 
 
 def load_non_transparent_zero_widths(
-    width_map: list[WidthState],
+    width_map: WidthMap,
 ) -> list[tuple[Codepoint, Codepoint]]:
     "Returns a list of characters with zero width but not 'Joining_Type=Transparent'"
 
+    zero_width_codes = {
+        code for code, state in enumerate(WIDTH_STATES) if state.width_alone() == 0
+    }
     zero_widths = set()
-    for cp, width in enumerate(width_map):
-        if width.width_alone() == 0:
+    for cp, code in enumerate(width_map):
+        if code in zero_width_codes:
             zero_widths.add(cp)
     transparent = set()
     load_property(
@@ -721,7 +957,7 @@ def load_ligature_transparent() -> list[tuple[Codepoint, Codepoint]]:
 
 def load_solidus_transparent(
     ligature_transparents: list[tuple[Codepoint, Codepoint]],
-    cjk_width_map: list[WidthState],
+    cjk_width_map: WidthMap,
 ) -> list[tuple[Codepoint, Codepoint]]:
     """Characters expanding to a canonical combining class above 1, plus `ligature_transparent`s from above.
     Ranges matching ones in `ligature_transparent` exactly are excluded (for compression), so it needs to be checked also.
@@ -741,15 +977,11 @@ def load_solidus_transparent(
     num_chars = len(ccc_above_1)
 
     # Recursive decompositions
+    decompositions = load_decompositions()
     while True:
-        with fetch_open("UnicodeData.txt") as udata:
-            single = re.compile(r"([0-9A-Z]+);.*?;.*?;.*?;.*?;([0-9A-F ]+);")
-            for line in udata.readlines():
-                if match := single.match(line):
-                    composed = int(match.group(1), 16)
-                    decomposed = [int(c, 16) for c in match.group(2).split(" ")]
-                    if all([c in ccc_above_1 for c in decomposed]):
-                        ccc_above_1.add(composed)
+        for composed, decomposed in decompositions:
+            if all([c in ccc_above_1 for c in decomposed]):
+                ccc_above_1.add(composed)
         if len(ccc_above_1) == num_chars:
             break
         else:
@@ -757,7 +989,8 @@ def load_solidus_transparent(
 
     for cp in ccc_above_1:
         if cp not in [0xFE00, 0xFE0F]:
-            assert cjk_width_map[cp].table_width() != CharWidthInTable.SPECIAL, (
+            width = WIDTH_STATES[cjk_width_map[cp]]
+            assert width.table_width() != CharWidthInTable.SPECIAL, (
                 f"U+{cp:X}"
             )
 
@@ -792,13 +1025,26 @@ def load_normalization_tests() -> list[tuple[str, str, str, str, str]]:
         return ret
 
 
+def load_emoji_test_sequences() -> list[str]:
+    """Returns the fully-qualified and component emoji sequences listed in `emoji-test.txt`,
+    all of which should have width 2."""
+    with fetch_open("emoji-test.txt") as emoji_tests:
+        ret = []
+        single = re.compile(r"^([0-9A-F ]+?)\s*;\s*(fully-qualified|component)\b")
+        for line in emoji_tests.readlines():
+            if match := single.match(line):
+                ret.append("".join(chr(int(cp, 16)) for cp in match.group(1).split()))
+        return ret
+
+
 def make_special_ranges(
-    width_map: list[WidthState],
+    width_map: WidthMap,
 ) -> list[tuple[tuple[Codepoint, Codepoint], WidthState]]:
     "Assign ranges of characters to their special behavior (used in match)"
     ret = []
     can_merge_with_prev = False
-    for cp, width in enumerate(width_map):
+    for cp, code in enumerate(width_map):
+        width = WIDTH_STATES[code]
         if width == WidthState.EMOJI_PRESENTATION:
             can_merge_with_prev = False
         elif width.table_width() == CharWidthInTable.SPECIAL:
@@ -850,12 +1096,69 @@ class Bucket:
         if len(self.widths) == 0:
             return None
         potential_width = self.widths[0]
-        for width in self.widths[1:]:
-            if potential_width != width:
-                return None
+        if self.widths.count(potential_width) != len(self.widths):
+            return None
         return potential_width
 
 
+class BucketIndex:
+    """Finds the first bucket of a list that a new bucket can be merged into (see
+    `Bucket.try_extend`) without comparing it against every bucket.
+
+    Each bucket is indexed under the prefixes of its width list whose lengths are the lengths
+    of any width list seen so far. A bucket can be merged into an existing one if the existing
+    width list is a prefix of the new one, that is, it is indexed under the new list's prefix
+    of its own length; or if the new width list is a prefix of the existing one, that is, the
+    existing one is indexed under the whole new list. There are only a few distinct lengths, so
+    this takes time linear in the size of the width lists."""
+
+    def __init__(self, buckets: list[Bucket]):
+        self.buckets = buckets
+        self.lengths: list[int] = []
+        self.by_prefix: dict[tuple, set[int]] = defaultdict(set)
+        for i in range(len(buckets)):
+            self._add_length(len(buckets[i].widths))
+            self._index(i, 0)
+
+    def _index(self, i: int, from_length: int):
+        "Indexes bucket `i` under its prefixes longer than `from_length`."
+        widths = self.buckets[i].widths
+        for length in self.lengths:
+            if from_length < length <= len(widths):
+                self.by_prefix[tuple(widths[:length])].add(i)
+
+    def _add_length(self, length: int):
+        if length in self.lengths:
+            return
+        self.lengths.append(length)
+        for i, bucket in enumerate(self.buckets):
+            if len(bucket.widths) >= length:
+                self.by_prefix[tuple(bucket.widths[:length])].add(i)
+
+    def insert(self, bucket: Bucket) -> int:
+        """Merges `bucket` into the first bucket it can be merged with, or appends it to the
+        list otherwise. Returns the index of the bucket it ended up in."""
+        widths = bucket.widths
+        self._add_length(len(widths))
+        candidates = [
+            i
+            for length in self.lengths
+            if length <= len(widths)
+            for i in self.by_prefix.get(tuple(widths[:length]), ())
+            if length == len(widths) or len(self.buckets[i].widths) == length
+        ]
+        if candidates:
+            i = min(candidates)
+            existing = self.buckets[i]
+            old_length = len(existing.widths)
+            assert existing.try_extend(bucket)
+            self._index(i, old_length)
+            return i
+        self.buckets.append(bucket)
+        self._index(len(self.buckets) - 1, 0)
+        return len(self.buckets) - 1
+
+
 def make_buckets(
     entries: Iterable[tuple[int, CharWidthInTable]], low_bit: BitPos, cap_bit: BitPos
 ) -> list[Bucket]:
@@ -913,34 +1216,17 @@ class Table:
         self.bytes_per_row = bytes_per_row
         self.cfged = cfged
 
-        buckets: list[Bucket] = []
+        index = BucketIndex(self.indexed)
         for entries in entry_groups:
-            buckets.extend(make_buckets(entries, self.low_bit, self.cap_bit))
-
-        for bucket in buckets:
-            for i, existing in enumerate(self.indexed):
-                if existing.try_extend(bucket):
-                    self.entries.append(i)
-                    break
-            else:
-                self.entries.append(len(self.indexed))
-                self.indexed.append(bucket)
+            for bucket in make_buckets(entries, self.low_bit, self.cap_bit):
+                self.entries.append(index.insert(bucket))
 
         self.primary_len = len(self.entries)
         self.primary_bucket_len = len(self.indexed)
 
-        buckets = []
         for entries in secondary_entry_groups:
-            buckets.extend(make_buckets(entries, self.low_bit, self.cap_bit))
-
-        for bucket in buckets:
-            for i, existing in enumerate(self.indexed):
-                if existing.try_extend(bucket):
-                    self.entries.append(i)
-                    break
-            else:
-                self.entries.append(len(self.indexed))
-                self.indexed.append(bucket)
+            for bucket in make_buckets(entries, self.low_bit, self.cap_bit):
+                self.entries.append(index.insert(bucket))
 
         # Validate offset type
         max_index = 1 << int(self.offset_type)
@@ -948,6 +1234,7 @@ class Table:
             assert index < max_index, f"{index} <= {max_index}"
 
         self.indexed = self.indexed[starting_indexed_len:]
+        self.bucket_count = len(self.indexed)
 
     def indices_to_widths(self):
         """Destructively converts the indices in this table to the `EffectiveWidth` values of
@@ -960,6 +1247,21 @@ class Table:
         """Returns an iterator over this table's buckets."""
         return self.indexed
 
+    def to_json(self) -> dict[str, Any]:
+        """Returns the fields of this table other than its buckets, which is all that is needed
+        to emit and verify it once `make_tables` is done, as a JSON-serializable value."""
+        fields = dict(self.__dict__)
+        fields.pop("indexed", None)
+        return fields
+
+    @staticmethod
+    def from_json(fields: dict[str, Any]) -> "Table":
+        """Restores a table saved with `to_json`. It has no buckets."""
+        table = Table.__new__(Table)
+        table.__dict__.update(fields)
+        table.offset_type = OffsetType(fields["offset_type"])
+        return table
+
     def to_bytes(self) -> list[int]:
         """Returns this table's entries as a list of bytes. The bytes are formatted according to
         the `OffsetType` which the table was created with, converting any `EffectiveWidth` entries
@@ -976,68 +1278,227 @@ class Table:
 
 
 def make_tables(
-    width_map: list[WidthState],
-    cjk_width_map: list[WidthState],
+    width_map: WidthMap,
+    cjk_width_map: WidthMap,
+    layout: TableLayout = TABLE_LAYOUT,
 ) -> list[Table]:
-    """Creates a table for each configuration in `table_cfgs`, with the first config corresponding
-    to the top-level lookup table, the second config corresponding to the second-level lookup
-    table, and so forth. `entries` is an iterator over the `(Codepoint, EffectiveWidth)` pairs
-    to include in the top-level table."""
+    """Creates a table for each level of `layout`, with the first two tables being the
+    top-level lookup tables for `width_map` and `cjk_width_map`, the next one corresponding to
+    the second-level lookup table, and so forth."""
 
-    entries = enumerate([w.table_width() for w in width_map])
-    cjk_entries = enumerate([w.table_width() for w in cjk_width_map])
+    table_widths = width_state_table(WidthState.table_width)
+    entries = enumerate(width_map.tobytes().translate(table_widths))
+    cjk_entries = enumerate(cjk_width_map.tobytes().translate(table_widths))
 
+    levels = layout.levels()
+    (name, low_bit, cap_bit, offset_type) = levels[0]
     root_table = Table(
-        "WIDTH_ROOT",
+        name,
         [entries],
         [],
-        TABLE_SPLITS[1],
-        MAX_CODEPOINT_BITS,
-        OffsetType.U8,
+        low_bit,
+        cap_bit,
+        offset_type,
         128,
     )
 
     cjk_root_table = Table(
-        "WIDTH_ROOT_CJK",
+        name + "_CJK",
         [cjk_entries],
         [],
-        TABLE_SPLITS[1],
-        MAX_CODEPOINT_BITS,
-        OffsetType.U8,
+        low_bit,
+        cap_bit,
+        offset_type,
         128,
         starting_indexed=root_table.indexed,
         cfged=True,
     )
 
-    middle_table = Table(
-        "WIDTH_MIDDLE",
-        map(lambda bucket: bucket.entries(), root_table.buckets()),
-        map(lambda bucket: bucket.entries(), cjk_root_table.buckets()),
-        TABLE_SPLITS[0],
-        TABLE_SPLITS[1],
-        OffsetType.U8,
-        2 ** (TABLE_SPLITS[1] - TABLE_SPLITS[0]),
-        bytes_per_row=2 ** (TABLE_SPLITS[1] - TABLE_SPLITS[0]),
-    )
+    tables = [root_table, cjk_root_table]
+    buckets = root_table.buckets()
+    cjk_buckets = cjk_root_table.buckets()
+    for name, low_bit, cap_bit, offset_type in levels[1:]:
+        bytes_per_row = 2 ** (cap_bit - low_bit) // (8 // int(offset_type))
+        table = Table(
+            name,
+            map(lambda bucket: bucket.entries(), buckets),
+            map(lambda bucket: bucket.entries(), cjk_buckets),
+            low_bit,
+            cap_bit,
+            offset_type,
+            bytes_per_row,
+            bytes_per_row=bytes_per_row,
+        )
+        tables.append(table)
+        buckets = table.buckets()[: table.primary_bucket_len]
+        cjk_buckets = table.buckets()[table.primary_bucket_len :]
 
-    leaves_table = Table(
-        "WIDTH_LEAVES",
-        map(
-            lambda bucket: bucket.entries(),
-            middle_table.buckets()[: middle_table.primary_bucket_len],
-        ),
-        map(
-            lambda bucket: bucket.entries(),
-            middle_table.buckets()[middle_table.primary_bucket_len :],
-        ),
-        0,
-        TABLE_SPLITS[0],
-        OffsetType.U2,
-        2 ** (TABLE_SPLITS[0] - 2),
-        bytes_per_row=2 ** (TABLE_SPLITS[0] - 2),
+    tables[-1].indices_to_widths()  # for the last table, indices == widths
+    return tables
+
+
+def make_latin1_tables(width_map: WidthMap, cjk_width_map: WidthMap) -> tuple[bytes, bytes]:
+    """Returns the table widths of the codepoints below `LATIN1_END` in `width_map` and
+    `cjk_width_map`, one per byte."""
+    table_widths = width_state_table(WidthState.table_width)
+    return (
+        width_map[:LATIN1_END].tobytes().translate(table_widths),
+        cjk_width_map[:LATIN1_END].tobytes().translate(table_widths),
     )
 
-    return [root_table, cjk_root_table, middle_table, leaves_table]
+
+def unpack_entries(data: bytes, offset_type: OffsetType) -> bytes:
+    """Returns the entries of a table stored in `data` with `offset_type`, one per byte, in the
+    order `lookup_width` reads them."""
+    bits = int(offset_type)
+    if offset_type == OffsetType.U8:
+        return data
+    entries_per_byte = 8 // bits
+    entries = bytearray(len(data) * entries_per_byte)
+    for j in range(entries_per_byte):
+        unpack = bytes((byte >> (j * bits)) & (2**bits - 1) for byte in range(256))
+        entries[j::entries_per_byte] = data.translate(unpack)
+    return bytes(entries)
+
+
+def verify_tables(
+    tables: list[Table],
+    width_map: WidthMap,
+    cjk_width_map: WidthMap,
+    layout: TableLayout = TABLE_LAYOUT,
+):
+    """Checks that looking up every codepoint in the bytes of `tables` the way `lookup_width`
+    does yields the table width of its state in `width_map` (or `cjk_width_map` for the CJK
+    root). Exits with code 1 on the first mismatch.
+
+    Rather than walking the tables once per codepoint, each sub-table is expanded into the widths
+    of all the codepoints it covers, from the leaves up, so that the root expands into the
+    widths of the whole codespace."""
+    levels = layout.levels()
+    expanded: list[bytes] = []
+    for table, (name, low_bit, cap_bit, _) in reversed(list(zip(tables[2:], levels[1:]))):
+        entries = unpack_entries(bytes(table.to_bytes()), table.offset_type)
+        row_len = 2 ** (cap_bit - low_bit)
+        rows = [entries[i : i + row_len] for i in range(0, len(entries), row_len)]
+        if expanded:
+            assert max(entries) < len(expanded), f"{name} has an offset out of range"
+            rows = [b"".join(map(expanded.__getitem__, row)) for row in rows]
+        expanded = rows
+
+    table_widths = width_state_table(WidthState.table_width)
+    for root, root_map in [(tables[0], width_map), (tables[1], cjk_width_map)]:
+        entries = unpack_entries(bytes(root.to_bytes()), root.offset_type)
+        assert max(entries) < len(expanded), f"{root.name} has an offset out of range"
+        widths = b"".join(map(expanded.__getitem__, entries))
+        expected = root_map.tobytes().translate(table_widths)
+        if widths[: len(expected)] == expected:
+            continue
+        mismatches = [
+            cp for cp, (got, want) in enumerate(zip(widths, expected)) if got != want
+        ]
+        mismatches += range(len(widths), len(expected))
+        cp = mismatches[0]
+        got = CharWidthInTable(widths[cp]).name if cp < len(widths) else "nothing"
+        sys.stderr.write(
+            f"{root.name} looks up {got} for U+{cp:04X} instead of "
+            f"{CharWidthInTable(expected[cp]).name} ({len(mismatches)} mismatches)\n"
+        )
+        sys.exit(1)
+
+
+def estimate_table_sizes(
+    width_map: WidthMap,
+    cjk_width_map: WidthMap,
+    max_depth: int = 4,
+) -> list[tuple[TableLayout, int]]:
+    """Returns the total size in bytes of the tables `make_tables` would create for every layout
+    of at most `max_depth` tables whose offsets fit in their offset types.
+
+    Rather than building each candidate, subtables are deduplicated level by level from the
+    leaves up, by hashing their contents. Layouts sharing their lower splits share that work."""
+    table_widths = width_state_table(WidthState.table_width)
+    widths = width_map.tobytes().translate(table_widths)
+    cjk_widths = cjk_width_map.tobytes().translate(table_widths)
+
+    def dedup(chunks: list[bytes]) -> tuple[array, int]:
+        ids: dict[bytes, int] = {}
+        return (array("I", [ids.setdefault(c, len(ids)) for c in chunks]), len(ids))
+
+    def chunked(data: bytes, size: int) -> list[bytes]:
+        return [data[i : i + size] for i in range(0, len(data), size)]
+
+    # Subtables at each level, keyed by the splits up to that level: the subtable ids of each
+    # position of both width maps, and the number of distinct subtables.
+    levels: dict[tuple[BitPos, ...], tuple[array, int]] = {}
+    results = []
+
+    # The root must be indexed by whole subtables, which holds as long as 2**top split
+    # divides NUM_CODEPOINTS.
+    max_split = (NUM_CODEPOINTS & -NUM_CODEPOINTS).bit_length() - 1
+    for depth in range(2, max_depth + 1):
+        for splits in itertools.combinations(range(2, max_split + 1), depth - 1):
+            for i in range(1, len(splits) + 1):
+                key = splits[:i]
+                if key in levels:
+                    continue
+                if i == 1:
+                    chunks = chunked(widths + cjk_widths, 2 ** splits[0])
+                else:
+                    (ids, _) = levels[key[:-1]]
+                    chunks = chunked(ids.tobytes(), ids.itemsize * 2 ** (key[-1] - key[-2]))
+                levels[key] = dedup(chunks)
+
+            counts = [levels[splits[: i + 1]][1] for i in range(len(splits))]
+            # The sizes in bytes of each table, assuming 8-bit offsets, from the leaves up.
+            leaves_size = counts[0] * 2 ** splits[0] // 4
+            index_entries = [
+                counts[i] * 2 ** (splits[i] - splits[i - 1]) for i in range(1, len(splits))
+            ]
+            index_entries.append(2 * 2 ** (MAX_CODEPOINT_BITS - splits[-1]))
+            index_bits = [splits[i] - splits[i - 1] for i in range(1, len(splits))]
+            index_bits.append(MAX_CODEPOINT_BITS - splits[-1])
+            for offset_types in itertools.product(OffsetType, repeat=len(splits)):
+                # `offset_types` lists the tables from the leaves up here.
+                if any(
+                    counts[i] > 1 << int(offset_type)
+                    or 2 ** index_bits[i] * int(offset_type) < 8
+                    for i, offset_type in enumerate(offset_types)
+                ):
+                    continue
+                size = leaves_size + sum(
+                    entries * int(offset_type) // 8
+                    for entries, offset_type in zip(index_entries, offset_types)
+                )
+                layout = TableLayout(splits, tuple(reversed(offset_types)))
+                results.append((layout, size))
+    return results
+
+
+def search_table_layout(
+    width_map: WidthMap,
+    cjk_width_map: WidthMap,
+    max_depth: int = 4,
+    top: int = 10,
+) -> TableLayout:
+    """Prints the smallest table layouts and returns the smallest one whose lookup cost does not
+    exceed the one of `TABLE_LAYOUT`. Ties are broken by lookup cost."""
+    candidates = estimate_table_sizes(width_map, cjk_width_map, max_depth)
+    max_cost = TABLE_LAYOUT.lookup_cost()
+    candidates.sort(key=lambda candidate: (candidate[1], candidate[0].lookup_cost()))
+    best = next(
+        layout for layout, _ in candidates if layout.lookup_cost() <= max_cost
+    )
+    print(f"Searched {len(candidates)} table layouts")
+    print(f"{'bytes':>8}  {'cost':>4}  layout")
+    shown = candidates[:top] + [
+        candidate for candidate in candidates if candidate[0] in (best, TABLE_LAYOUT)
+    ]
+    for layout, size in sorted(set(shown), key=lambda c: (c[1], c[0].lookup_cost())):
+        mark = (" (best)" if layout == best else "") + (
+            " (current)" if layout == TABLE_LAYOUT else ""
+        )
+        print(f"{size:>8}  {layout.lookup_cost():>4}  {layout}{mark}")
+    return best
 
 
 def load_emoji_presentation_sequences() -> list[Codepoint]:
@@ -1103,6 +1564,19 @@ def load_emoji_modifier_bases() -> list[Codepoint]:
     return ret
 
 
+def cull_duplicate_leaves(leaves: list[list[Any]]) -> tuple[list[list[Any]], list[int]]:
+    """Removes duplicate leaves, keeping the first occurrence of each. Returns the remaining
+    leaves and, for each leaf of `leaves`, the index of its copy among them."""
+    culled: list[list[Any]] = []
+    first_indexes: dict[tuple, int] = {}
+    indexes = []
+    for leaf in leaves:
+        indexes.append(first_indexes.setdefault(tuple(leaf), len(culled)))
+        if indexes[-1] == len(culled):
+            culled.append(leaf)
+    return (culled, indexes)
+
+
 def make_presentation_sequence_table(
     seqs: list[Codepoint],
     lsb: int = 10,
@@ -1125,22 +1599,8 @@ def make_presentation_sequence_table(
             leaf[idx_in_leaf] |= 1 << bit_shift
         leaves.append(leaf)
 
-    indexes = [(msb, index) for (index, msb) in enumerate(msbs)]
-
-    # Cull duplicate leaves
-    i = 0
-    while i < len(leaves):
-        first_idx = leaves.index(leaves[i])
-        if first_idx == i:
-            i += 1
-        else:
-            for j in range(0, len(indexes)):
-                if indexes[j][1] == i:
-                    indexes[j] = (indexes[j][0], first_idx)
-                elif indexes[j][1] > i:
-                    indexes[j] = (indexes[j][0], indexes[j][1] - 1)
-
-            leaves.pop(i)
+    leaves, leaf_indexes = cull_duplicate_leaves(leaves)
+    indexes = [(msb, leaf_indexes[index]) for (index, msb) in enumerate(msbs)]
 
     return (indexes, leaves)
 
@@ -1168,30 +1628,77 @@ def make_ranges_table(
                 leaf.append((cp, cp))
         leaves.append(leaf)
 
-    indexes = [(msb, index) for (index, msb) in enumerate(msbs)]
+    leaves, leaf_indexes = cull_duplicate_leaves(leaves)
+    indexes = [(msb, leaf_indexes[index]) for (index, msb) in enumerate(msbs)]
 
-    # Cull duplicate leaves
-    i = 0
-    while i < len(leaves):
-        first_idx = leaves.index(leaves[i])
-        if first_idx == i:
-            i += 1
-        else:
-            for j in range(0, len(indexes)):
-                if indexes[j][1] == i:
-                    indexes[j] = (indexes[j][0], first_idx)
-                elif indexes[j][1] > i:
-                    indexes[j] = (indexes[j][0], indexes[j][1] - 1)
+    return (indexes, leaves)
 
-            leaves.pop(i)
 
-    return (indexes, leaves)
+def lookup_table_code(
+    layout: TableLayout, root_name: str, table_format: TableFormat = TableFormat.BYTES
+) -> str:
+    """Returns the statements of `lookup_width` that look up the packed width of `cp` in the
+    tables of `layout`, written in `table_format`, binding it to `width`."""
+    s = ""
+    levels = layout.levels()
+    offset = None
+    for i, (name, low_bit, cap_bit, offset_type) in enumerate(levels):
+        name = root_name if i == 0 else name.lower()
+        bits = int(offset_type)
+        entries_per_byte = 8 // bits
+        shift = low_bit + entries_per_byte.bit_length() - 1
+        if i == 0:
+            s += f"""
+    // {name} is indexed by the top {cap_bit - low_bit} bits of the codepoint."""
+            index = f"cp >> {shift}"
+            read = f"{name}[{index}]"
+        else:
+            s += f"""
+    // Each sub-table in {name} is indexed by bits {low_bit}..{cap_bit} of the codepoint.
+    // (Sub-tables are selected using the computed offset from the previous table.)"""
+            mask = 2 ** (cap_bit - low_bit) // entries_per_byte - 1
+            index = f"(cp >> {shift}) & 0x{mask:X}"
+            if table_format == TableFormat.BYTES:
+                # Sub-tables are stored back to back, and their size is a power of two.
+                row_bits = mask.bit_length()
+                read = f"{name}[({offset} << {row_bits}) | ({index})]"
+            else:
+                read = f"{name}[{offset}.reinterpret_as_int()][{index}]"
+        if table_format == TableFormat.BYTES:
+            read += ".to_int()"
+        if i == len(levels) - 1:
+            var = "width"
+            s += """
+    // Since this is the last table, each entry represents an encoded width."""
+        else:
+            var = f"t{i + 1}_offset"
+        if offset_type == OffsetType.U8:
+            if var == "width" and table_format == TableFormat.BYTES:
+                read = f"{read}.reinterpret_as_uint()"
+            s += f"""
+    let {var} = {read}
+"""
+        else:
+            packed = "packed_widths" if var == "width" else f"t{i + 1}_packed"
+            position = f"(cp >> {low_bit})" if low_bit > 0 else "cp"
+            unpack = f"({packed} >> ({bits} * ({position} & 0b{entries_per_byte - 1:b}))) & 0b{2**bits - 1:b}"
+            if var == "width" and table_format == TableFormat.BYTES:
+                unpack = f"({unpack}).reinterpret_as_uint()"
+            s += f"""
+    // Each stored entry is {bits} bits, packed {entries_per_byte} per byte.
+    let {packed} = {read}
+    let {var} = {unpack}
+"""
+        offset = var
+    return s
 
 
 def lookup_fns(
     is_cjk: bool,
     special_ranges: list[tuple[tuple[Codepoint, Codepoint], WidthState]],
     joining_group_lam: list[tuple[Codepoint, Codepoint]],
+    layout: TableLayout = TABLE_LAYOUT,
+    table_format: TableFormat = TableFormat.BYTES,
 ) -> str:
     if is_cjk:
         cfg = "// CJK variant\n"
@@ -1203,34 +1710,27 @@ def lookup_fns(
         cjk_lo = ""
         cjk_cap = ""
         ambig = "narrow"
+    if table_format == TableFormat.BYTES:
+        latin1_read = f"width_latin1{cjk_lo}[cp].to_int().reinterpret_as_uint()"
+    else:
+        latin1_read = f"width_latin1{cjk_lo}[cp]"
     s = f"""
 ///| Returns the [UAX #11](https://www.unicode.org/reports/tr11/) based width of `c` by
 ///| consulting a multi-level lookup table.
 ///|
 ///| # Maintenance
-///| The tables themselves are autogenerated but this function is hardcoded. You should have
-///| nothing to worry about if you re-run `unicode.py` (for example, when updating Unicode.)
-///| However, if you change the *actual structure* of the lookup tables (perhaps by editing the
-///| `make_tables` function in `unicode.py`) you must ensure that this code reflects those changes.
+///| The tables and this function are autogenerated from the table layout in `unicode.py`
+///| ({layout}). Change `TABLE_SPLITS` and `TABLE_OFFSET_TYPES` there, or run
+///| `unicode.py --search` to pick the smallest layout, rather than editing this code.
 {cfg}fn lookup_width{cjk_lo}(c : Char) -> (UInt, WidthInfo) {{
     let cp = c.to_int()
-
-    let t1_offset = width_root{cjk_cap.lower()}[cp >> {TABLE_SPLITS[1]}]
-
-    // Each sub-table in width_middle is 7 bits, and each stored entry is a byte,
-    // so each sub-table is 128 bytes in size.
-    // (Sub-tables are selected using the computed offset from the previous table.)
-    let t2_offset = width_middle[t1_offset.reinterpret_as_int()][(cp >> {TABLE_SPLITS[0]}) & 0x{(2 ** (TABLE_SPLITS[1] - TABLE_SPLITS[0]) - 1):X}]
-
-    // Each sub-table in width_leaves is 6 bits, but each stored entry is 2 bits.
-    // This is accomplished by packing four stored entries into one byte.
-    // So each sub-table is 2**(7-2) == 32 bytes in size.
-    // Since this is the last table, each entry represents an encoded width.
-    let packed_widths = width_leaves[t2_offset.reinterpret_as_int()][(cp >> 2) & 0x{(2 ** (TABLE_SPLITS[0] - 2) - 1):X}]
-
-    // Extract the packed width
-    let width = (packed_widths >> (2 * (cp & 0b11))) & 0b11
-
+    let width = if cp < 0x{LATIN1_END:X} {{
+        // Codepoints below U+{LATIN1_END:04X} are read directly from width_latin1{cjk_lo}.
+        {latin1_read}
+    }} else {{
+{lookup_table_code(layout, "width_root" + cjk_cap.lower(), table_format)}
+        width
+    }}
     if width < 3 {{
         (width, default_width_info)
     }} else {{
@@ -1554,14 +2054,38 @@ def lookup_fns(
 }}
 
 {cfg}fn str_width{cjk_lo}_impl(s : StringView) -> Int {{
-    s.rev_iter().fold(
-        init=(0, default_width_info),
-        fn(acc, c) {{
-            let (sum, next_info) = acc
-            let (add, info) = width_in_str{cjk_lo}(c, next_info)
-            (sum + add, info)
+    // Characters are visited from the end, since the width of a character can depend on the
+    // ones after it. While the state is `default_width_info`, every ASCII character but '\\n'
+    // has width 1 and keeps that state (see `width_in_str{cjk_lo}`), so runs of them are
+    // counted by code unit, without decoding characters or consulting the lookup tables.
+    let mut sum = 0
+    let mut next_info = default_width_info
+    let mut end = s.length()
+    while end > 0 {{
+        if next_info == default_width_info {{
+            let mut start = end
+            while start > 0 && s[start - 1].to_int() is (0x00..=0x09 | 0x0B..=0x7F) {{
+                start -= 1
+            }}
+            sum += end - start
+            end = start
+            if end == 0 {{
+                break
+            }}
+        }}
+        let low = s[end - 1].to_int()
+        end -= 1
+        let c = if low is (0xDC00..=0xDFFF) && end > 0 && s[end - 1].to_int() is (0xD800..=0xDBFF) {{
+            end -= 1
+            (0x10000 + ((s[end].to_int() - 0xD800) << 10) + (low - 0xDC00)).unsafe_to_char()
+        }} else {{
+            low.unsafe_to_char()
         }}
-    ).0
+        let (add, info) = width_in_str{cjk_lo}(c, next_info)
+        sum += add
+        next_info = info
+    }}
+    sum
 }}
 """
 
@@ -1572,6 +2096,7 @@ def emit_module(
     out_name: str,
     unicode_version: tuple[int, int, int],
     tables: list[Table],
+    latin1_tables: tuple[bytes, bytes],
     special_ranges: list[tuple[tuple[Codepoint, Codepoint], WidthState]],
     special_ranges_cjk: list[tuple[tuple[Codepoint, Codepoint], WidthState]],
     emoji_presentation_table: tuple[list[tuple[int, int]], list[list[int]]],
@@ -1581,9 +2106,11 @@ def emit_module(
     non_transparent_zero_widths: list[tuple[Codepoint, Codepoint]],
     ligature_transparent: list[tuple[Codepoint, Codepoint]],
     solidus_transparent: list[tuple[Codepoint, Codepoint]],
-    normalization_tests: list[tuple[str, str, str, str, str]],
+    layout: TableLayout = TABLE_LAYOUT,
+    table_format: TableFormat = TableFormat.BYTES,
 ):
-    """Outputs a MoonBit module to `out_name` using table data from `tables`.
+    """Outputs a MoonBit module to `out_name` using table data from `tables`, which were made
+    with `layout`. The width tables are written in `table_format`.
     If `TABLE_CFGS` is edited, you may need to edit the included code for `lookup_width`.
     """
     if os.path.exists(out_name):
@@ -1734,8 +2261,12 @@ fn unset_vs1_2(self : WidthInfo) -> WidthInfo {
 pub let unicode_version : (Int, Int, Int) = {unicode_version}
 """)
 
-        module.write(lookup_fns(False, special_ranges, joining_group_lam))
-        module.write(lookup_fns(True, special_ranges_cjk, joining_group_lam))
+        module.write(
+            lookup_fns(False, special_ranges, joining_group_lam, layout, table_format)
+        )
+        module.write(
+            lookup_fns(True, special_ranges_cjk, joining_group_lam, layout, table_format)
+        )
 
         emoji_presentation_idx, emoji_presentation_leaves = emoji_presentation_table
         text_presentation_idx, text_presentation_leaves = text_presentation_table
@@ -1935,13 +2466,53 @@ fn is_emoji_modifier_base(c : Char) -> Bool {
 
 """)
 
+        for name, latin1_table in zip(["width_latin1", "width_latin1_cjk"], latin1_tables):
+            module.write(
+                f"///| Autogenerated. The table width of each codepoint below U+{LATIN1_END:04X}, indexed directly by [`lookup_width`].\n"
+            )
+            if name.endswith("_cjk"):
+                module.write("// CJK only\n")
+            if table_format == TableFormat.BYTES:
+                literal = "".join(f"\\x{byte:02x}" for byte in latin1_table)
+                module.write(f'let {name} : Bytes = b"{literal}"\n\n')
+            else:
+                module.write(f"let {name} : Array[UInt] = [")
+                for j, byte in enumerate(latin1_table):
+                    if j % 16 == 0:
+                        module.write("\n   ")
+                    module.write(f" 0x{byte:02X},")
+                module.write("\n]\n\n")
+
         subtable_count = 1
         for i, table in enumerate(tables):
-            new_subtable_count = len(table.buckets())
-            if i == len(tables) - 1:
-                table.indices_to_widths()  # for the last table, indices == widths
+            new_subtable_count = table.bucket_count
             byte_array = table.to_bytes()
 
+            if table_format == TableFormat.BYTES:
+                if table.bytes_per_row is None:
+                    module.write(
+                        f"///| Autogenerated. {subtable_count} sub-table(s). Consult [`lookup_width`] for layout info.\n"
+                    )
+                else:
+                    num_rows = len(byte_array) // table.bytes_per_row
+                    num_primary_rows = (
+                        table.primary_len
+                        // (8 // int(table.offset_type))
+                        // table.bytes_per_row
+                    )
+                    module.write(
+                        f"""
+// CJK variant has {num_rows} rows, non-CJK has {num_primary_rows} rows
+///| Autogenerated. {subtable_count} sub-table(s) of {table.bytes_per_row} bytes, stored back to back. Consult [`lookup_width`] for layout info.
+"""
+                    )
+                if table.cfged:
+                    module.write("// CJK only\n")
+                literal = "".join(f"\\x{byte:02x}" for byte in byte_array)
+                module.write(f'let {table.name.lower()} : Bytes = b"{literal}"\n')
+                subtable_count = new_subtable_count
+                continue
+
             if table.bytes_per_row is None:
                 module.write(
                     f"///| Autogenerated. {subtable_count} sub-table(s). Consult [`lookup_width`] for layout info.\n"
@@ -2070,88 +2641,235 @@ let emoji_modifier_leaf_{leaf_idx} : Array[(UInt, UInt)] = [
                 if not variant.is_non_cjk_only():
                     test_width_variants_cjk.append(variant)
 
-        # Generate normalization test data for MoonBit tests
+
+@functools.cache
+def load_invisible_ranges() -> list[tuple[Codepoint, Codepoint]]:
+    "Returns the ranges of controls, format characters, separators and unassigned codepoints."
+    return load_property_ranges("extracted/DerivedGeneralCategory.txt", r"C.|Z.")
+
+
+def moonbit_string(s: str) -> str:
+    """Returns `s` as a MoonBit string literal. Invisible characters other than the space are
+    escaped so that the generated source stays readable."""
+    invisible = load_invisible_ranges()
+    ret = ['"']
+    for c in s:
+        cp = ord(c)
+        i = bisect.bisect_right(invisible, (cp, NUM_CODEPOINTS)) - 1
+        if c in '"\\':
+            ret.append("\\" + c)
+        elif c in "\t\n":
+            ret.append("\\t" if c == "\t" else "\\n")
+        elif c != " " and i >= 0 and invisible[i][1] >= cp:
+            ret.append(f"\\u{{{cp:04X}}}")
+        else:
+            ret.append(c)
+    ret.append('"')
+    return "".join(ret)
+
+
+def encode_normalization_test(columns: tuple[str, str, str, str, str]) -> str:
+    """Joins `columns` with tabs, leaving out each column that equals the one before it."""
+    assert all(column and "\t" not in column for column in columns), columns
+    return "\t".join(
+        "" if i > 0 and column == columns[i - 1] else column
+        for i, column in enumerate(columns)
+    )
+
+
+def emit_test_module(
+    out_name: str,
+    normalization_tests: list[tuple[str, str, str, str, str]],
+    emoji_test_sequences: list[str],
+):
+    """Outputs the MoonBit test data to `out_name`. It is kept out of the module written by
+    `emit_module` so that only test builds compile it.
+    """
+    if os.path.exists(out_name):
+        os.remove(out_name)
+    with open(out_name, "w", newline="\n", encoding="utf-8") as module:
         module.write(
-            """
-///| Test data for normalization tests
-let normalization_test_data : Array[(String, String, String, String, String)] = [\n"""
+            """// Copyright 2012-2025 The Rust Project Developers
+// Copyright 2025 International Digital Economy Academy
+//
+// Licensed under the Apache License, Version 2.0 <LICENSE-APACHE or
+// http://www.apache.org/licenses/LICENSE-2.0>. This file may not be
+// copied, modified, or distributed except according to those terms.
+
+// NOTE: The following code was generated by "unicode.py", do not edit directly
+
+///|
+/// One record per test of `NormalizationTest.txt`: the columns (orig, nfc, nfd, nfkc, nfkd)
+/// separated by tabs, where an empty column is the same as the one before it.
+let normalization_test_records : Array[String] = [
+"""
         )
-        for orig, nfc, nfd, nfkc, nfkd in normalization_tests:
-            # Escape quotes and backslashes for MoonBit strings
-            orig_escaped = orig.replace("\\", "\\\\").replace('"', '\\"')
-            nfc_escaped = nfc.replace("\\", "\\\\").replace('"', '\\"')
-            nfd_escaped = nfd.replace("\\", "\\\\").replace('"', '\\"')
-            nfkc_escaped = nfkc.replace("\\", "\\\\").replace('"', '\\"')
-            nfkd_escaped = nfkd.replace("\\", "\\\\").replace('"', '\\"')
-            module.write(
-                f'    ("{orig_escaped}", "{nfc_escaped}", "{nfd_escaped}", "{nfkc_escaped}", "{nfkd_escaped}"),\n'
-            )
+        for columns in normalization_tests:
+            module.write(f"  {moonbit_string(encode_normalization_test(columns))},\n")
+        module.write(
+            """]
 
-        module.write("]\n")
+///|
+/// Decodes `normalization_test_records` into (orig, nfc, nfd, nfkc, nfkd) tuples.
+fn normalization_test_data() -> Array[(String, String, String, String, String)] {
+  normalization_test_records.map(record => {
+    let columns : Array[String] = []
+    for column in record.split("\\t") {
+      columns.push(
+        if column.is_empty() {
+          columns[columns.length() - 1]
+        } else {
+          column.to_string()
+        },
+      )
+    }
+    (columns[0], columns[1], columns[2], columns[3], columns[4])
+  })
+}
 
-        # Generate MoonBit inline tests for normalization
-        module.write("""
-///| Test that normalization test data is accessible and well-formed
+///|
+/// The fully-qualified and component sequences of `emoji-test.txt`, all of which have width 2.
+let emoji_test_sequences : Array[String] = [
+"""
+        )
+        for sequence in emoji_test_sequences:
+            module.write(f"  {moonbit_string(sequence)},\n")
+        module.write(
+            """]
+
+///|
+/// Test that normalization test data is accessible and well-formed
 test "normalization_test_data_accessibility" {
-    // Test that we can access the normalization test data
-    let data_length = normalization_test_data.length()
-    inspect(data_length > 0, content="true")
-    
-    // Test that each entry has 5 components (orig, nfc, nfd, nfkc, nfkd)
-    let test_count = if data_length < 10 { data_length } else { 10 }
-    for i = 0; i < test_count; i = i + 1 {
-        let (orig, nfc, nfd, nfkc, nfkd) = normalization_test_data[i]
-        inspect(orig.length() >= 0, content="true")
-        inspect(nfc.length() >= 0, content="true")
-        inspect(nfd.length() >= 0, content="true")
-        inspect(nfkc.length() >= 0, content="true")
-        inspect(nfkd.length() >= 0, content="true")
-    }
+  // Test that we can access the normalization test data
+  let normalization_test_data = normalization_test_data()
+  let data_length = normalization_test_data.length()
+  inspect(data_length > 0, content="true")
+
+  // Test that each entry has 5 components (orig, nfc, nfd, nfkc, nfkd)
+  let test_count = if data_length < 10 { data_length } else { 10 }
+  for i = 0; i < test_count; i = i + 1 {
+    let (orig, nfc, nfd, nfkc, nfkd) = normalization_test_data[i]
+    inspect(orig.length() >= 0, content="true")
+    inspect(nfc.length() >= 0, content="true")
+    inspect(nfd.length() >= 0, content="true")
+    inspect(nfkc.length() >= 0, content="true")
+    inspect(nfkd.length() >= 0, content="true")
+  }
 }
 
-///| Test specific normalization cases
+///|
+/// Test specific normalization cases
 test "normalization_specific_cases" {
-    // Test that we have some expected normalization test cases
-    let mut found_decomposition = false
-    let mut found_composition = false
-    
-    let test_count = if normalization_test_data.length() < 100 { normalization_test_data.length() } else { 100 }
-    for i = 0; i < test_count; i = i + 1 {
-        let (orig, nfc, nfd, _nfkc, _nfkd) = normalization_test_data[i]
-        
-        // Look for cases where NFC != NFD (composition/decomposition differences)
-        if nfc != nfd {
-            found_decomposition = true
-        }
-        
-        // Look for cases where original != NFC (composition needed)
-        if orig != nfc {
-            found_composition = true
-        }
+  // Test that we have some expected normalization test cases
+  let normalization_test_data = normalization_test_data()
+  let mut found_decomposition = false
+  let mut found_composition = false
+  let test_count = if normalization_test_data.length() < 100 {
+    normalization_test_data.length()
+  } else {
+    100
+  }
+  for i = 0; i < test_count; i = i + 1 {
+    let (orig, nfc, nfd, _nfkc, _nfkd) = normalization_test_data[i]
+
+    // Look for cases where NFC != NFD (composition/decomposition differences)
+    if nfc != nfd {
+      found_decomposition = true
     }
-    
-    inspect(found_decomposition, content="true")
-    inspect(found_composition, content="true")
+
+    // Look for cases where original != NFC (composition needed)
+    if orig != nfc {
+      found_composition = true
+    }
+  }
+  inspect(found_decomposition, content="true")
+  inspect(found_composition, content="true")
 }
-""")
+"""
+        )
 
 
-def main(module_path: str):
-    """Obtain character data from the latest version of Unicode, transform it into a multi-level
-    lookup table for character width, and write a MoonBit module utilizing that table to
-    `module_filename`.
+def table_sizes(
+    tables: list[Table],
+    latin1_tables: tuple[bytes, bytes],
+    emoji_presentation_table: tuple[list[tuple[int, int]], list[list[int]]],
+    text_presentation_table: tuple[list[tuple[int, int]], list[list[tuple[int, int]]]],
+    emoji_modifier_table: tuple[list[tuple[int, int]], list[list[tuple[int, int]]]],
+    non_transparent_zero_widths: list[tuple[Codepoint, Codepoint]],
+    solidus_transparent: list[tuple[Codepoint, Codepoint]],
+) -> dict[str, int]:
+    """Returns the size in bytes of each table of the generated module, by name."""
+    sizes = {}
+    for table in tables:
+        sizes[table.name.lower()] = len(table.to_bytes())
+    sizes["width_latin1"] = len(latin1_tables[0])
+    sizes["width_latin1_cjk"] = len(latin1_tables[1])
+
+    index, leaves = emoji_presentation_table
+    sizes["emoji_presentation_index"] = len(index) * (
+        math.ceil(math.log(index[-1][0], 256)) + 8
+    )
+    sizes["emoji_presentation_leaves"] = len(leaves) * len(leaves[0])
 
-    See the generated MoonBit module for documentation of the exact width rules.
-    """
-    version = load_unicode_version()
-    print(f"Generating module for Unicode {version[0]}.{version[1]}.{version[2]}")
+    for name, (index, leaves) in [
+        ("text_presentation", text_presentation_table),
+        ("emoji_modifier", emoji_modifier_table),
+    ]:
+        sizes[f"{name}_index"] = len(index) * (math.ceil(math.log(index[-1][0], 256)) + 16)
+        sizes[f"{name}_leaves"] = 2 * sum(map(len, leaves))
 
-    (width_map, cjk_width_map) = load_width_maps()
+    sizes["non_transparent_zero_widths"] = 6 * len(non_transparent_zero_widths)
+    sizes["solidus_transparent"] = 6 * len(solidus_transparent)
+    return sizes
 
-    tables = make_tables(width_map, cjk_width_map)
 
-    special_ranges = make_special_ranges(width_map)
-    cjk_special_ranges = make_special_ranges(cjk_width_map)
+def generate_module(
+    module_path: str,
+    version: tuple[int, int, int],
+    search: bool = False,
+    max_depth: int = 4,
+    table_format: TableFormat = TableFormat.BYTES,
+) -> dict[str, Any]:
+    """Writes the MoonBit module to `module_path` (see `main`) and returns its size report.
+
+    The width tables and special ranges, which take most of the time to build, are cached with
+    `cached`, so that they are only built again when one of `WIDTH_MAP_FILES` changes."""
+    (width_map, cjk_width_map) = load_width_maps()
+
+    layout = TABLE_LAYOUT
+    if search:
+        (splits, offset_types) = cached(
+            "layout",
+            WIDTH_MAP_FILES,
+            lambda: dataclasses.astuple(
+                search_table_layout(width_map, cjk_width_map, max_depth)
+            ),
+            key=f"max_depth={max_depth}",
+        )
+        layout = TableLayout(tuple(splits), tuple(map(OffsetType, offset_types)))
+        print(f"Using table layout: {layout}")
+    tables = [
+        Table.from_json(fields)
+        for fields in cached(
+            "tables",
+            WIDTH_MAP_FILES,
+            lambda: [
+                table.to_json() for table in make_tables(width_map, cjk_width_map, layout)
+            ],
+            key=str(layout),
+        )
+    ]
+    verify_tables(tables, width_map, cjk_width_map, layout)
+    latin1_tables = make_latin1_tables(width_map, cjk_width_map)
+
+    (special_ranges, cjk_special_ranges) = (
+        [((low, high), WidthState(width)) for (low, high), width in ranges]
+        for ranges in cached(
+            "special-ranges",
+            WIDTH_MAP_FILES,
+            lambda: [make_special_ranges(width_map), make_special_ranges(cjk_width_map)],
+        )
+    )
 
     emoji_presentations = load_emoji_presentation_sequences()
     emoji_presentation_table = make_presentation_sequence_table(emoji_presentations)
@@ -2167,52 +2885,27 @@ def main(module_path: str):
     ligature_transparent = load_ligature_transparent()
     solidus_transparent = load_solidus_transparent(ligature_transparent, cjk_width_map)
 
-    normalization_tests = load_normalization_tests()
-
-    fetch_open("emoji-test.txt", "../", emoji=True)
-
+    sizes = table_sizes(
+        tables,
+        latin1_tables,
+        emoji_presentation_table,
+        text_presentation_table,
+        emoji_modifier_table,
+        non_transparent_zero_widths,
+        solidus_transparent,
+    )
     print("------------------------")
-    total_size = 0
-    for i, table in enumerate(tables):
-        size_bytes = len(table.to_bytes())
-        print(f"Table {i} size: {size_bytes} bytes")
-        total_size += size_bytes
-
-    for s, table in [
-        ("Emoji presentation", emoji_presentation_table),
-    ]:
-        index_size = len(table[0]) * (math.ceil(math.log(table[0][-1][0], 256)) + 8)
-        print(f"{s} index size: {index_size} bytes")
-        total_size += index_size
-        leaves_size = len(table[1]) * len(table[1][0])
-        print(f"{s} leaves size: {leaves_size} bytes")
-        total_size += leaves_size
-
-    for s, table in [
-        ("Text presentation", text_presentation_table),
-        ("Emoji modifier", emoji_modifier_table),
-    ]:
-        index_size = len(table[0]) * (math.ceil(math.log(table[0][-1][0], 256)) + 16)
-        print(f"{s} index size: {index_size} bytes")
-        total_size += index_size
-        leaves_size = 2 * sum(map(len, table[1]))
-        print(f"{s} leaves size: {leaves_size} bytes")
-        total_size += leaves_size
-
-    for s, table in [
-        ("Non transparent zero width", non_transparent_zero_widths),
-        ("Solidus transparent", solidus_transparent),
-    ]:
-        table_size = 6 * len(table)
-        print(f"{s} table size: {table_size} bytes")
-        total_size += table_size
+    for name, size in sizes.items():
+        print(f"{name} size: {size} bytes")
+    print(f"Lookup cost: {layout.lookup_cost()} ({layout})")
     print("------------------------")
-    print(f"  Total size: {total_size} bytes")
+    print(f"  Total size: {sum(sizes.values())} bytes")
 
     emit_module(
         out_name=module_path,
         unicode_version=version,
         tables=tables,
+        latin1_tables=latin1_tables,
         special_ranges=special_ranges,
         special_ranges_cjk=cjk_special_ranges,
         emoji_presentation_table=emoji_presentation_table,
@@ -2222,10 +2915,162 @@ def main(module_path: str):
         non_transparent_zero_widths=non_transparent_zero_widths,
         ligature_transparent=ligature_transparent,
         solidus_transparent=solidus_transparent,
-        normalization_tests=normalization_tests,
+        layout=layout,
+        table_format=table_format,
     )
-    print(f'Wrote to "{module_path}"')
+    return {
+        "unicode_version": ".".join(map(str, version)),
+        "layout": str(layout),
+        "lookup_cost": layout.lookup_cost(),
+        "table_format": table_format.value,
+        "sizes": sizes,
+        "total_size": sum(sizes.values()),
+    }
+
+
+def generate_test_module(test_module_path: str):
+    """Writes the MoonBit test data to `test_module_path` (see `main`)."""
+    emit_test_module(
+        out_name=test_module_path,
+        normalization_tests=load_normalization_tests(),
+        emoji_test_sequences=load_emoji_test_sequences(),
+    )
+
+
+def output_digest(path: str) -> str:
+    "Returns the SHA-256 hash of the content of `path`."
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def load_manifest() -> dict[str, Any]:
+    "Returns the manifest written by the last run, or an empty one."
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"outputs": {}}
+
+
+def is_up_to_date(manifest: dict[str, Any], path: str, key: str) -> bool:
+    """Whether `manifest` records that `path` was written from the inputs hashed into `key`, and
+    `path` has not been changed since."""
+    output = manifest["outputs"].get(path)
+    return (
+        output is not None
+        and output["key"] == key
+        and os.path.exists(path)
+        and output_digest(path) == output["sha256"]
+    )
+
+
+def format_module(path: str):
+    "Formats `path` with `FORMATTER`, if it is installed."
+    if shutil.which(FORMATTER[0]) is None:
+        print(f'{FORMATTER[0]} not found, "{path}" is left unformatted')
+        return
+    subprocess.run([*FORMATTER, path], check=True)
+
+
+def main(
+    module_path: str,
+    test_module_path: str,
+    search: bool = False,
+    max_depth: int = 4,
+    table_format: TableFormat = TableFormat.BYTES,
+    force: bool = False,
+):
+    """Obtain character data from the latest version of Unicode, transform it into a multi-level
+    lookup table for character width, and write a MoonBit module utilizing that table to
+    `module_path`. Data used only by tests is written to `test_module_path`.
+
+    If `search` is set, the layout of the lookup table is chosen by `search_table_layout` among
+    layouts of up to `max_depth` levels, instead of using `TABLE_LAYOUT`. The tables are
+    written in `table_format`. Generation fails if `verify_tables` finds a codepoint whose width
+    the tables do not reproduce.
+
+    Each output is only written again if its inputs (the Unicode data files it depends on, this
+    script and the options above) changed since the run recorded in `MANIFEST_PATH`, or if it was
+    modified since, unless `force` is set. The size report of the module is written to
+    `SIZE_REPORT_PATH`.
+
+    See the generated MoonBit module for documentation of the exact width rules.
+    """
+    version = load_unicode_version()
+    print(f"Generating module for Unicode {version[0]}.{version[1]}.{version[2]}")
+
+    options = {
+        "layout": f"search up to {max_depth} levels" if search else str(TABLE_LAYOUT),
+        "table_format": table_format.value,
+    }
+    keys = {
+        module_path: inputs_digest(MODULE_FILES, json.dumps(options, sort_keys=True)),
+        test_module_path: inputs_digest(TEST_MODULE_FILES),
+    }
+    manifest = load_manifest()
+    stale = [
+        path
+        for path, key in keys.items()
+        if force or not is_up_to_date(manifest, path, key)
+    ]
+    if not stale:
+        print("Nothing changed since the last run")
+        return
+
+    for path in stale:
+        output = {"key": keys[path]}
+        if path == module_path:
+            report = generate_module(module_path, version, search, max_depth, table_format)
+            write_json(SIZE_REPORT_PATH, report, indent=2)
+            output["layout"] = report["layout"]
+        else:
+            generate_test_module(test_module_path)
+        format_module(path)
+        output["sha256"] = output_digest(path)
+        manifest["outputs"][path] = output
+        print(f'Wrote to "{path}"')
+
+    manifest["unicode_version"] = UNICODE_VERSION
+    manifest["generator"] = generator_digest().hex()
+    manifest["inputs"] = {
+        filename: file_digest(filename).hex()
+        for filename in sorted({*MODULE_FILES, *TEST_MODULE_FILES})
+    }
+    write_json(MANIFEST_PATH, manifest, indent=2)
 
 
 if __name__ == "__main__":
-    main(MODULE_PATH)
+    parser = argparse.ArgumentParser(
+        description="Generates the MoonBit width tables from the Unicode Character Database."
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="search for the smallest lookup table layout instead of using TABLE_LAYOUT",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=4,
+        help="the maximum number of table levels considered by --search",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate the outputs even if none of their inputs changed",
+    )
+    parser.add_argument(
+        "--table-format",
+        choices=[table_format.value for table_format in TableFormat],
+        default=TableFormat.BYTES.value,
+        help="how the width lookup tables are written (default: bytes)",
+    )
+    args = parser.parse_args()
+    main(
+        MODULE_PATH,
+        TEST_MODULE_PATH,
+        search=args.search,
+        max_depth=args.max_depth,
+        table_format=TableFormat(args.table_format),
+        force=args.force,
+    )
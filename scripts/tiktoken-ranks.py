@@ -0,0 +1,258 @@
+"""Compile tiktoken BPE rank files into MoonBit assets.
+
+A `.tiktoken` file lists every mergeable token as a base64 string followed by
+its rank. Embedding it as is means that every process decodes and parses each
+line and then hashes all of the tokens into a map before it can encode
+anything. This script does that work once, at build time, and embeds the
+result as a single binary blob that `internal/tiktoken` reads in place.
+
+Usage:
+    python scripts/tiktoken-ranks.py [--source DIR] [ENCODING ...]
+
+The script should be run from the project root directory. For each manifest
+entry (or only the named ones), it reads `DIR/<name>.tiktoken` if `--source`
+is given and downloads the file from `openaipublic` otherwise, checks its
+SHA-256 against the published one, and writes the compiled ranks to the
+entry's destination.
+
+Blob layout (all integers are little-endian):
+
+    header        6 x u32: magic, token count, bucket count, slot count,
+                  hash seed, arena size
+    offsets       (token count + 1) x u24: start of each rank's bytes in the
+                  arena; rank `r` is `arena[offsets[r]:offsets[r + 1]]`, and
+                  an empty piece means the rank is unused
+    displacements bucket count x u16
+    slots         slot count x u24: the rank stored in each slot
+    arena         the bytes of every token, in rank order
+
+Tokens are looked up with a minimal perfect hash (hash and displace): the
+FNV-1a hash of a piece selects a bucket, the bucket's displacement selects
+its slot, and the piece is a token exactly if it equals the arena bytes of
+the rank stored in that slot.
+"""
+
+import argparse
+import base64
+import hashlib
+import struct
+import sys
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+
+MAGIC = 0x31455042  # "BPE1"
+HEADER = struct.Struct("<6I")
+MAX_U24 = (1 << 24) - 1
+MAX_DISPLACEMENT = (1 << 16) - 1
+KEYS_PER_BUCKET = 4
+LINE_WIDTH = 76  # base64 characters per line, a multiple of 4
+
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+MASK = 0xFFFFFFFF
+
+
+@dataclass
+class Manifest:
+    name: str
+    url: str
+    sha256: str
+    destination: Path
+
+    def load(self, source: Path | None) -> bytes:
+        if source is not None:
+            data = (source / f"{self.name}.tiktoken").read_bytes()
+        else:
+            with urllib.request.urlopen(self.url) as response:
+                data = response.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != self.sha256:
+            sys.exit(f"{self.name}: expected sha256 {self.sha256}, got {digest}")
+        return data
+
+    def compile(self, source: Path | None) -> None:
+        ranks = parse_ranks(self.load(source))
+        blob = compile_ranks(ranks)
+        verify_ranks(blob, ranks)
+        text = base64.b64encode(blob).decode("ascii")
+        lines = [
+            f"// Generated by scripts/tiktoken-ranks.py from {self.name}.tiktoken, DON'T EDIT IT",
+            "",
+            "///|",
+            f"let {self.name}_ranks_base64 : String =",
+        ]
+        for start in range(0, len(text), LINE_WIDTH):
+            lines.append(f"  #|{text[start:start + LINE_WIDTH]}")
+        lines.append("")
+        self.destination.write_text("\n".join(lines))
+        print(
+            f"COMPILE {self.name}: {len(ranks)} tokens, {len(blob)} bytes"
+            f" -> {self.destination}"
+        )
+
+
+manifests = [
+    Manifest(
+        name="cl100k_base",
+        url="https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+        sha256="223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7",
+        destination=Path("internal/tiktoken/cl100k_base.ranks.mbt"),
+    ),
+]
+
+
+def parse_ranks(data: bytes) -> dict[bytes, int]:
+    ranks = {}
+    for line in data.splitlines():
+        if not line:
+            continue
+        token, rank = line.split()
+        ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+def fnv1a(piece: bytes, seed: int) -> int:
+    h = FNV_OFFSET ^ seed
+    for b in piece:
+        h = ((h ^ b) * FNV_PRIME) & MASK
+    return h
+
+
+def mix(h: int) -> int:
+    # The finalizer of MurmurHash3, a bijection on 32-bit integers.
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & MASK
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & MASK
+    h ^= h >> 16
+    return h
+
+
+def slot_of(h: int, displacement: int, slot_count: int) -> int:
+    return mix(h ^ displacement) % slot_count
+
+
+def place(
+    hashes: list[int], bucket_count: int, slot_count: int
+) -> list[int] | None:
+    """Finds a displacement for every bucket such that all hashes land in
+    distinct slots, placing the largest buckets first. Returns `None` if
+    some bucket does not fit."""
+    buckets: list[list[int]] = [[] for _ in range(bucket_count)]
+    for h in hashes:
+        buckets[h % bucket_count].append(h)
+    displacements = [0] * bucket_count
+    taken = bytearray(slot_count)
+    for bucket in sorted(range(bucket_count), key=lambda b: -len(buckets[b])):
+        keys = buckets[bucket]
+        if not keys:
+            break
+        for displacement in range(MAX_DISPLACEMENT + 1):
+            slots = {slot_of(h, displacement, slot_count) for h in keys}
+            if len(slots) == len(keys) and not any(taken[s] for s in slots):
+                break
+        else:
+            return None
+        for s in slots:
+            taken[s] = 1
+        displacements[bucket] = displacement
+    return displacements
+
+
+def compile_ranks(ranks: dict[bytes, int]) -> bytes:
+    token_count = max(ranks.values()) + 1
+    pieces = [b""] * token_count
+    for piece, rank in ranks.items():
+        pieces[rank] = piece
+    arena = b"".join(pieces)
+    if len(arena) > MAX_U24 or token_count > MAX_U24:
+        sys.exit("ranks are too large for 24-bit offsets")
+    slot_count = len(ranks)
+    bucket_count = (slot_count + KEYS_PER_BUCKET - 1) // KEYS_PER_BUCKET
+    for seed in range(256):
+        hashes = {fnv1a(piece, seed): rank for piece, rank in ranks.items()}
+        if len(hashes) < len(ranks):
+            continue
+        displacements = place(list(hashes), bucket_count, slot_count)
+        if displacements is not None:
+            break
+    else:
+        sys.exit("no perfect hash found")
+    slots = [0] * slot_count
+    for h, rank in hashes.items():
+        displacement = displacements[h % bucket_count]
+        slots[slot_of(h, displacement, slot_count)] = rank
+    offsets = [0]
+    for piece in pieces:
+        offsets.append(offsets[-1] + len(piece))
+    header = HEADER.pack(
+        MAGIC, token_count, bucket_count, slot_count, seed, len(arena)
+    )
+    return b"".join(
+        [
+            header,
+            b"".join(offset.to_bytes(3, "little") for offset in offsets),
+            b"".join(d.to_bytes(2, "little") for d in displacements),
+            b"".join(rank.to_bytes(3, "little") for rank in slots),
+            arena,
+        ]
+    )
+
+
+def verify_ranks(blob: bytes, ranks: dict[bytes, int]) -> None:
+    """Looks every token up in `blob` the way `internal/tiktoken` does, and
+    checks that near misses are rejected."""
+    _, token_count, bucket_count, slot_count, seed, _ = HEADER.unpack_from(blob)
+    offsets = HEADER.size
+    displacements = offsets + (token_count + 1) * 3
+    slots = displacements + bucket_count * 2
+    arena = slots + slot_count * 3
+
+    def u24(at: int) -> int:
+        return int.from_bytes(blob[at : at + 3], "little")
+
+    def piece(rank: int) -> bytes:
+        start = arena + u24(offsets + rank * 3)
+        end = arena + u24(offsets + rank * 3 + 3)
+        return blob[start:end]
+
+    def lookup(key: bytes) -> int | None:
+        h = fnv1a(key, seed)
+        bucket = displacements + h % bucket_count * 2
+        displacement = int.from_bytes(blob[bucket : bucket + 2], "little")
+        rank = u24(slots + slot_of(h, displacement, slot_count) * 3)
+        return rank if piece(rank) == key else None
+
+    for key, rank in ranks.items():
+        if lookup(key) != rank or piece(rank) != key:
+            sys.exit(f"compiled ranks disagree on {key!r} (rank {rank})")
+        miss = key + b"\x00"
+        if miss not in ranks and lookup(miss) is not None:
+            sys.exit(f"compiled ranks accept {miss!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--source",
+        type=Path,
+        help="read <name>.tiktoken files from this directory instead of downloading them",
+    )
+    parser.add_argument(
+        "encodings",
+        nargs="*",
+        help="encodings to compile (default: all)",
+    )
+    args = parser.parse_args()
+    names = [manifest.name for manifest in manifests]
+    for name in args.encodings:
+        if name not in names:
+            parser.error(f"unknown encoding {name!r} (choose from {', '.join(names)})")
+    for manifest in manifests:
+        if not args.encodings or manifest.name in args.encodings:
+            manifest.compile(args.source)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,151 @@
-import importlib.resources as resources
 import asyncio
-import platform
 import maria.events
-from typing import AsyncGenerator
+import os
+from maria._executable import executable
+from maria._reader import DEFAULT_HIGH_WATER_MARK, LineReader
+from maria.batch import Batch, Result
+from maria.daemon import DaemonClient
+from maria.pool import MariaPool
+from maria.session import Session
+from typing import AsyncGenerator, Iterable
 
-
-def _get_system() -> str:
-    return f"{platform.system().lower()}-{platform.machine().lower()}"
+__all__ = ["Batch", "DaemonClient", "Maria", "MariaPool", "Result", "Session"]
 
 
 class Maria:
+    """Runs prompts in a fresh `sdk.exe exec` process each.
+
+    Notifications are read from the process's stdout with a `LineReader`, so
+    lines of any size (such as a large `post_tool_call` result) are supported.
+    At most about `high_water_mark` bytes are buffered ahead of the consumer;
+    beyond that the agent is paused by the full pipe. Lines longer than
+    `max_line_size` bytes, if set, raise `ValueError`.
+
+    If a prompt is cancelled, exceeds its deadline or is abandoned by the
+    caller, the agent is asked to stop with a `maria.cancel` message on its
+    stdin, and killed if it has not exited after `cancel_grace_period`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+        max_line_size: int | None = None,
+        cancel_grace_period: float = 5.0,
+    ):
+        self.high_water_mark = high_water_mark
+        self.max_line_size = max_line_size
+        self.cancel_grace_period = cancel_grace_period
+
+    async def _cancel(self, process: asyncio.subprocess.Process) -> None:
+        assert process.stdin is not None
+        try:
+            async with asyncio.timeout(self.cancel_grace_period):
+                process.stdin.write(b'{"method": "maria.cancel"}\n')
+                await process.stdin.drain()
+                await process.wait()
+        except (TimeoutError, OSError):
+            pass
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
     async def start(
-        self, prompt: str
-    ) -> AsyncGenerator[maria.events.Notification, None]:
-        system = _get_system()
-        resource = resources.files("maria").joinpath("bin").joinpath(f"{system}.exe")
-        with resources.as_file(resource) as executable_path:
-            process = await asyncio.create_subprocess_exec(
-                executable_path,
-                "exec",
-                prompt,
-                stdout=asyncio.subprocess.PIPE,
-            )
-            assert process.stdout is not None
-
-            # Read stdout asynchronously line by line
+        self,
+        prompt: str,
+        lazy: bool = False,
+        stream: bool = False,
+        deadline: float | None = None,
+    ) -> AsyncGenerator[
+        maria.events.Notification | maria.events.LazyNotification, None
+    ]:
+        """Runs `prompt` in a fresh agent process and yields its notifications.
+
+        With `lazy=True`, notifications are yielded as
+        `maria.events.LazyNotification`, which defers pydantic validation until
+        the parsed model is actually used. With `stream=True`, the model
+        response is streamed and `maria.agent.delta` notifications are yielded
+        as it is generated. If `deadline` (in terms of `loop.time()`) passes
+        first, the prompt is cancelled and `TimeoutError` is raised."""
+        args = ["exec", prompt]
+        if stream:
+            args.append("--stream")
+        executable_path = executable()
+        process = await asyncio.create_subprocess_exec(
+            executable_path,
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=self.high_water_mark,
+        )
+        assert process.stdin is not None
+        assert process.stdout is not None
+        stdout = LineReader(process.stdout, max_line_size=self.max_line_size)
+
+        # Read stdout asynchronously line by line
+        try:
             while True:
-                line = await process.stdout.readline()
+                async with asyncio.timeout_at(deadline):
+                    line = await stdout.readline()
                 if not line:
                     break
-                yield maria.events.notification.validate_json(line)
+                yield maria.events.decode(line, lazy=lazy)
+        except BaseException:
+            # Cancelled, timed out, abandoned by the caller or failed.
+            await self._cancel(process)
+            raise
+        finally:
+            process.stdin.close()
+
+        status = await process.wait()
+        if status != 0:
+            raise RuntimeError(f"Maria process failed to start: {status}")
+
+    async def stream_events(
+        self, prompt: str
+    ) -> AsyncGenerator[maria.events.Notification, None]:
+        """Like `start`, but streams the model response as `Delta`
+        notifications.
+
+        Lines are only read from the agent process as the iterator is
+        advanced, so a slow consumer leaves the output in the pipe and
+        eventually blocks the agent instead of buffering it in Python."""
+        async for event in self.start(prompt, stream=True):
+            yield event
+
+    async def stream_text(self, prompt: str) -> AsyncGenerator[str, None]:
+        """Yields the assistant's text as it is generated, skipping every other
+        notification without validating it."""
+        async for event in self.start(prompt, lazy=True, stream=True):
+            if event.method == "maria.agent.delta":
+                content = event.params.get("content")
+                if content:
+                    yield content
+
+    def map(
+        self,
+        prompts: Iterable[str],
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        ordered: bool = True,
+        token_budget: int | None = None,
+    ) -> Batch:
+        """Runs `prompts` with at most `concurrency` agent processes at a time,
+        one per CPU by default. See `Batch` for the other arguments.
 
-            status = await process.wait()
-            if status != 0:
-                raise RuntimeError(f"Maria process failed to start: {status}")
+        ```python
+        batch = Maria().map(prompts, timeout=600, token_budget=10_000_000)
+        async for result in batch:
+            print(result.index, result.error or result.message)
+        print(batch.usage)
+        ```
+        """
+        return Batch(
+            self.start,
+            prompts,
+            concurrency=concurrency or os.cpu_count() or 1,
+            timeout=timeout,
+            ordered=ordered,
+            token_budget=token_budget,
+        )
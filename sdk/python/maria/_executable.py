@@ -0,0 +1,75 @@
+import functools
+import hashlib
+import importlib.resources as resources
+import os
+import platform
+import stat
+import tempfile
+from pathlib import Path
+
+
+def _get_system() -> str:
+    return f"{platform.system().lower()}-{platform.machine().lower()}"
+
+
+# Resolved once at import rather than on every prompt.
+SYSTEM = _get_system()
+_RESOURCE = resources.files("maria").joinpath("bin").joinpath(f"{SYSTEM}.exe")
+
+
+def _cache_dir() -> Path:
+    if cache_home := os.environ.get("XDG_CACHE_HOME"):
+        return Path(cache_home) / "maria"
+    return Path.home() / ".cache" / "maria"
+
+
+def _ensure_executable(path: Path) -> None:
+    mode = path.stat().st_mode
+    executable = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+    if mode & executable != executable:
+        path.chmod(mode | executable)
+
+
+def _extract() -> Path:
+    """Copies the bundled executable to the on-disk cache, keyed by the hash
+    of its content, unless an intact copy is already there."""
+    content = _RESOURCE.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    directory = _cache_dir()
+    path = directory / f"{SYSTEM}-{digest[:16]}.exe"
+    if path.is_file() and hashlib.sha256(path.read_bytes()).hexdigest() == digest:
+        _ensure_executable(path)
+        return path
+    directory.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so that concurrent processes never run
+    # a partially written executable.
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".exe.tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.chmod(temporary, 0o755)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
+
+
+@functools.cache
+def executable() -> Path:
+    """Returns the path of the bundled `sdk.exe` for the current platform.
+
+    When the package is installed as plain files, that is the bundled file
+    itself. Otherwise (for example from a zip archive) it is extracted once
+    into `~/.cache/maria`, and later processes reuse the extracted copy as
+    long as its content hash matches. The result is cached for the lifetime
+    of the process.
+    """
+    if isinstance(_RESOURCE, Path) and _RESOURCE.is_file():
+        try:
+            _ensure_executable(_RESOURCE)
+            return _RESOURCE
+        except OSError:
+            # A read-only installation without the executable bit set.
+            pass
+    return _extract()
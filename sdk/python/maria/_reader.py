@@ -0,0 +1,49 @@
+import asyncio
+
+# Bytes buffered from the agent's stdout before reading from the pipe is paused.
+# Once the pipe itself is full, the agent blocks on its next write, so a slow
+# consumer holds back the agent instead of growing the Python heap.
+DEFAULT_HIGH_WATER_MARK = 1 << 20
+
+
+class LineReader:
+    """Reads newline-delimited messages of any size from a stream.
+
+    `asyncio.StreamReader.readline` fails with `LimitOverrunError` on lines
+    longer than the stream's limit (64 KiB by default), which a single large
+    tool result easily exceeds. This reader instead collects such lines chunk
+    by chunk, so the stream limit only bounds how much is buffered ahead of
+    the consumer.
+
+    Lines longer than `max_line_size` bytes raise `ValueError`.
+    """
+
+    def __init__(
+        self, stream: asyncio.StreamReader, max_line_size: int | None = None
+    ):
+        self.stream = stream
+        self.max_line_size = max_line_size
+
+    async def readline(self) -> bytes:
+        """Returns the next line including its trailing newline, or `b""` at
+        EOF."""
+        chunks: list[bytes] = []
+        size = 0
+        while True:
+            try:
+                chunk = await self.stream.readuntil(b"\n")
+                done = True
+            except asyncio.IncompleteReadError as e:
+                chunk = e.partial
+                done = True
+            except asyncio.LimitOverrunError as e:
+                chunk = await self.stream.readexactly(e.consumed)
+                done = False
+            size += len(chunk)
+            if self.max_line_size is not None and size > self.max_line_size:
+                raise ValueError(
+                    f"Line from Maria process exceeds {self.max_line_size} bytes"
+                )
+            chunks.append(chunk)
+            if done:
+                return chunks[0] if len(chunks) == 1 else b"".join(chunks)
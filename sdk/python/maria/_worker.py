@@ -0,0 +1,132 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from maria._reader import DEFAULT_HIGH_WATER_MARK, LineReader
+from maria.events import peek_method
+from typing import Any, AsyncGenerator
+
+
+class Worker:
+    """A long-lived `sdk.exe serve` process.
+
+    Requests are written to the process's stdin as line-delimited JSON-RPC
+    messages. Notifications produced while a request is running are streamed
+    back on stdout, followed by a response carrying the request's `id`.
+    """
+
+    def __init__(
+        self, process: asyncio.subprocess.Process, max_line_size: int | None = None
+    ):
+        self.process = process
+        assert process.stdout is not None
+        self.stdout = LineReader(process.stdout, max_line_size=max_line_size)
+        self.requests = 0
+        self.last_used = time.monotonic()
+        self._ids = itertools.count()
+        # The id of the request whose response has not been read yet.
+        self._pending: int | None = None
+
+    @classmethod
+    async def spawn(
+        cls,
+        executable_path: str | os.PathLike[str],
+        model: str | None = None,
+        high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+        max_line_size: int | None = None,
+    ) -> "Worker":
+        args = ["serve"]
+        if model is not None:
+            args += ["--model", model]
+        process = await asyncio.create_subprocess_exec(
+            executable_path,
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=high_water_mark,
+        )
+        return cls(process, max_line_size=max_line_size)
+
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def _send(self, method: str, params: dict[str, Any] | None = None) -> int:
+        assert self.process.stdin is not None
+        id = next(self._ids)
+        request: dict[str, Any] = {"id": id, "method": method}
+        if params is not None:
+            request["params"] = params
+        self.process.stdin.write(json.dumps(request).encode() + b"\n")
+        await self.process.stdin.drain()
+        return id
+
+    async def call(
+        self, method: str, params: dict[str, Any] | None = None
+    ) -> AsyncGenerator[bytes, None]:
+        """Sends a request and yields the notifications it produces as raw
+        lines, until the response for the request arrives."""
+        id = await self._send(method, params)
+        self._pending = id
+        while True:
+            line = await self.stdout.readline()
+            if not line:
+                status = await self.process.wait()
+                raise RuntimeError(f"Maria process exited unexpectedly: {status}")
+            if peek_method(line) is not None:
+                yield line
+                continue
+            message = json.loads(line)
+            if "method" in message:
+                yield line
+            elif message.get("id") == id:
+                self._pending = None
+                self.last_used = time.monotonic()
+                if "error" in message:
+                    raise RuntimeError(message["error"]["message"])
+                return
+            elif "error" in message and message.get("id") is None:
+                raise RuntimeError(message["error"]["message"])
+
+    async def cancel(self, grace_period: float) -> bool:
+        """Cancels the request in flight, if any, and waits up to
+        `grace_period` seconds for the process to acknowledge it. Returns
+        whether the worker is ready for the next request."""
+        if self._pending is None:
+            return self.alive()
+        try:
+            async with asyncio.timeout(grace_period):
+                id = await self._send("maria.cancel")
+                # The response to the cancelled request, if still pending,
+                # precedes the response to `maria.cancel`.
+                while True:
+                    line = await self.stdout.readline()
+                    if not line:
+                        return False
+                    if peek_method(line) is None and json.loads(line).get("id") == id:
+                        break
+            self._pending = None
+            self.last_used = time.monotonic()
+            return True
+        except (TimeoutError, OSError, ValueError):
+            return False
+
+    async def ping(self) -> None:
+        async for _ in self.call("maria.ping"):
+            pass
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Asks the process to shut down, killing it if it does not exit within
+        `timeout` seconds."""
+        try:
+            if self.alive():
+                async with asyncio.timeout(timeout):
+                    async for _ in self.call("maria.shutdown"):
+                        pass
+                    await self.process.wait()
+        except (TimeoutError, RuntimeError, OSError):
+            pass
+        finally:
+            if self.alive():
+                self.process.kill()
+                await self.process.wait()
@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+import dataclasses
+import itertools
+import maria.events
+from openai.types.completion_usage import CompletionUsage
+from typing import AsyncIterator, Callable, Iterable
+
+
+@dataclasses.dataclass
+class Result:
+    """The outcome of one prompt of a `Batch`."""
+
+    index: int
+    prompt: str
+    events: list[maria.events.Notification]
+    usage: CompletionUsage
+    # `TimeoutError` if the prompt exceeded its timeout, or whatever else was
+    # raised while running it.
+    error: BaseException | None = None
+
+    @property
+    def message(self) -> str | None:
+        """The content of the last assistant message."""
+        for event in reversed(self.events):
+            if isinstance(event, maria.events.RequestCompleted):
+                return event.params.message.content
+        return None
+
+
+def _add(total: CompletionUsage, usage: CompletionUsage) -> CompletionUsage:
+    return CompletionUsage(
+        prompt_tokens=total.prompt_tokens + usage.prompt_tokens,
+        completion_tokens=total.completion_tokens + usage.completion_tokens,
+        total_tokens=total.total_tokens + usage.total_tokens,
+    )
+
+
+def _empty_usage() -> CompletionUsage:
+    return CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+
+
+class Batch:
+    """Runs many prompts with at most `concurrency` of them at a time.
+
+    Iterating a batch yields one `Result` per prompt, in the order of
+    `prompts` if `ordered`, or as they complete otherwise. Prompts are pulled
+    from `prompts` lazily, so it may be a large or unbounded iterable.
+
+    `usage` holds the token usage totals of all prompts completed so far. Once
+    it reaches `token_budget` total tokens, no further prompts are started;
+    those already running are still completed and yielded.
+    """
+
+    def __init__(
+        self,
+        start: Callable[[str], AsyncIterator[maria.events.Notification]],
+        prompts: Iterable[str],
+        concurrency: int,
+        timeout: float | None = None,
+        ordered: bool = True,
+        token_budget: int | None = None,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be positive, got {concurrency}")
+        self.start = start
+        self.prompts = prompts
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ordered = ordered
+        self.token_budget = token_budget
+        self.usage = _empty_usage()
+
+    def exhausted(self) -> bool:
+        return (
+            self.token_budget is not None
+            and self.usage.total_tokens >= self.token_budget
+        )
+
+    async def _run(self, index: int, prompt: str) -> Result:
+        result = Result(index, prompt, events=[], usage=_empty_usage())
+        try:
+            async with (
+                asyncio.timeout(self.timeout),
+                contextlib.aclosing(self.start(prompt)) as events,
+            ):
+                async for event in events:
+                    result.events.append(event)
+                    if (
+                        isinstance(event, maria.events.RequestCompleted)
+                        and event.params.usage is not None
+                    ):
+                        result.usage = _add(result.usage, event.params.usage)
+        except Exception as e:
+            result.error = e
+        self.usage = _add(self.usage, result.usage)
+        return result
+
+    async def __aiter__(self) -> AsyncIterator[Result]:
+        prompts = enumerate(self.prompts)
+        results: asyncio.Queue[Result | None] = asyncio.Queue()
+
+        async def work() -> None:
+            try:
+                while not self.exhausted():
+                    item = next(prompts, None)
+                    if item is None:
+                        break
+                    await results.put(await self._run(*item))
+            finally:
+                await results.put(None)
+
+        # The workers must not outlive the iteration: a consumer may stop
+        # early, and a task group cannot be held open across a `yield`.
+        tasks = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            pending: dict[int, Result] = {}
+            indices = itertools.count()
+            next_index = next(indices)
+            running = self.concurrency
+            while running > 0:
+                result = await results.get()
+                if result is None:
+                    running -= 1
+                    continue
+                if not self.ordered:
+                    yield result
+                    continue
+                pending[result.index] = result
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index = next(indices)
+            # Raises whatever a worker raised, such as an error from `prompts`.
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import httpx
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator
+
+
+class DaemonClient:
+    """An asyncio client for the Maria daemon HTTP/SSE API.
+
+    All requests share one keep-alive connection pool, and the status of every
+    task is tracked through a single `GET /v1/events` subscription, so many
+    tasks can run concurrently without an OS process or pipe per task on the
+    client side.
+
+    The daemon port is read from `~/.moonagent/daemon.json`. If no daemon is
+    reachable, one is spawned with `<executable> daemon --port 0 --detach`.
+
+    ```python
+    async with DaemonClient() as daemon:
+        task = await daemon.run("Write a JSON parser in MoonBit.", cwd="/tmp/x")
+        print(task["status"])
+    ```
+    """
+
+    def __init__(
+        self,
+        executable: str | os.PathLike[str] | None = None,
+        home: str | os.PathLike[str] | None = None,
+        max_connections: int = 100,
+        timeout: float = 60.0,
+    ):
+        self.executable = executable
+        self.home = Path(home) if home is not None else Path.home()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.tasks: dict[str, dict[str, Any]] = {}
+        self._client: httpx.AsyncClient | None = None
+        self._listener: asyncio.Task[None] | None = None
+        self._synchronized = asyncio.Event()
+        self._watchers: dict[str, set[asyncio.Queue[dict[str, Any]]]] = {}
+
+    async def __aenter__(self) -> "DaemonClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        assert self._client is not None, "DaemonClient is not open"
+        return self._client
+
+    async def open(self) -> None:
+        port = await self._discover_port()
+        self._client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=self.timeout,
+        )
+        self._listener = asyncio.create_task(self._listen())
+        synchronized = asyncio.create_task(self._synchronized.wait())
+        await asyncio.wait(
+            {self._listener, synchronized}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not synchronized.done():
+            synchronized.cancel()
+            # The subscription ended before the initial snapshot; re-raise why.
+            self._listener.result()
+            raise RuntimeError("Maria daemon closed the event stream")
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _read_port(self) -> int | None:
+        try:
+            info = json.loads((self.home / ".moonagent" / "daemon.json").read_text())
+        except (OSError, ValueError):
+            return None
+        port = info.get("port")
+        return port if isinstance(port, int) else None
+
+    async def _reachable(self, port: int) -> bool:
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(f"http://127.0.0.1:{port}/v1/tasks")
+            return response.is_success
+        except httpx.HTTPError:
+            return False
+
+    async def _discover_port(self) -> int:
+        port = self._read_port()
+        if port is not None and await self._reachable(port):
+            return port
+        executable = self.executable or shutil.which("maria")
+        if executable is None:
+            raise RuntimeError("No Maria daemon is running and `maria` is not found")
+        # The daemon records its port under `$HOME`, which must be `self.home`
+        # for `_read_port` to find it.
+        process = await asyncio.create_subprocess_exec(
+            executable,
+            "daemon",
+            "--port",
+            "0",
+            "--detach",
+            env={**os.environ, "HOME": str(self.home)},
+        )
+        status = await process.wait()
+        if status != 0:
+            raise RuntimeError(f"Maria daemon failed to start: {status}")
+        port = self._read_port()
+        if port is None:
+            raise RuntimeError("Maria daemon did not record its port")
+        return port
+
+    async def _listen(self) -> None:
+        """Consumes `GET /v1/events` and dispatches task updates to watchers."""
+        async with self.client.stream("GET", "/v1/events", timeout=None) as response:
+            response.raise_for_status()
+            event: str | None = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                elif line.startswith("data: "):
+                    data = json.loads(line.removeprefix("data: "))
+                    if event == "daemon.tasks.synchronized":
+                        for task in data["tasks"]:
+                            self._update(task)
+                        self._synchronized.set()
+                    elif event == "daemon.task.changed":
+                        self._update(data["task"])
+                    event = None
+
+    def _update(self, task: dict[str, Any]) -> None:
+        self.tasks[task["id"]] = task
+        for queue in self._watchers.get(task["id"], ()):
+            queue.put_nowait(task)
+
+    @contextlib.asynccontextmanager
+    async def watch(self, task_id: str) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+        """Yields a queue receiving every update of `task_id` from the shared
+        event subscription while the context is active."""
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._watchers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            watchers = self._watchers[task_id]
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[task_id]
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        """Sends a request and returns its JSON body, raising `RuntimeError`
+        for every error status, such as 409 when a task is already running in
+        the requested `cwd`."""
+        response = await self.client.request(method, url, **kwargs)
+        if response.is_error:
+            raise RuntimeError(
+                f"Maria daemon returned {response.status_code} for {method} {url}:"
+                f" {response.text}"
+            )
+        return response.json()
+
+    async def _next_update(
+        self, updates: asyncio.Queue[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Waits for the next task update in `updates`, raising if the event
+        subscription ends first, as no further update would arrive."""
+        listener = self._listener
+        assert listener is not None, "DaemonClient is not open"
+        update = asyncio.ensure_future(updates.get())
+        try:
+            await asyncio.wait(
+                {update, listener}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            if not update.done():
+                update.cancel()
+        if update.done() and not update.cancelled():
+            return update.result()
+        listener.result()
+        raise RuntimeError("Maria daemon closed the event stream")
+
+    async def list_models(self) -> list[dict[str, Any]]:
+        return (await self._request("GET", "/v1/models"))["models"]
+
+    async def list_tasks(self) -> list[dict[str, Any]]:
+        return (await self._request("GET", "/v1/tasks"))["tasks"]
+
+    async def get_task(self, task_id: str) -> dict[str, Any]:
+        return (await self._request("GET", f"/v1/task/{task_id}"))["task"]
+
+    async def create_task(
+        self,
+        prompt: str | None = None,
+        *,
+        name: str | None = None,
+        model: str | None = None,
+        cwd: str | os.PathLike[str] | None = None,
+        web_search: bool | None = None,
+    ) -> dict[str, Any]:
+        """Creates a task. Raises `RuntimeError` if a task is already running
+        in `cwd`."""
+        request: dict[str, Any] = {}
+        if name is not None:
+            request["name"] = name
+        if model is not None:
+            request["model"] = model
+        if cwd is not None:
+            request["cwd"] = os.fspath(cwd)
+        if web_search is not None:
+            request["web_search"] = web_search
+        if prompt is not None:
+            request["message"] = {"role": "user", "content": prompt}
+        return (await self._request("POST", "/v1/task", json=request))["task"]
+
+    async def send_message(
+        self, task_id: str, prompt: str, web_search: bool | None = None
+    ) -> dict[str, Any]:
+        request: dict[str, Any] = {"message": {"role": "user", "content": prompt}}
+        if web_search is not None:
+            request["web_search"] = web_search
+        return await self._request(
+            "POST", f"/v1/task/{task_id}/message", json=request
+        )
+
+    async def cancel(self, task_id: str) -> dict[str, Any]:
+        return await self._request("POST", f"/v1/task/{task_id}/cancel")
+
+    async def run(
+        self,
+        prompt: str,
+        *,
+        task_id: str | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """Sends `prompt` to a task (a new one unless `task_id` is given) and
+        waits until the task has finished generating. Returns the final task
+        state."""
+        if task_id is None:
+            task_id = (await self.create_task(**kwargs))["id"]
+        # Subscribe before sending, so that no status change can be missed.
+        async with self.watch(task_id) as updates:
+            await self.send_message(task_id, prompt)
+            generating = False
+            while True:
+                task = await self._next_update(updates)
+                if task["status"] == "generating":
+                    generating = True
+                elif task["status"] == "stopped" or (
+                    generating and task["status"] == "idle"
+                ):
+                    return task
+
+    async def task_events(self, task_id: str) -> AsyncGenerator[dict[str, Any], None]:
+        """Streams the agent events of a single task."""
+        async with self.client.stream(
+            "GET", f"/v1/task/{task_id}/events", timeout=None
+        ) as response:
+            response.raise_for_status()
+            event: str | None = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                elif line.startswith("data: "):
+                    yield {"event": event, "data": json.loads(line.removeprefix("data: "))}
+                    event = None
@@ -1,4 +1,6 @@
+import json
 import pydantic
+import re
 from openai.types.chat.chat_completion_message import ChatCompletionMessage
 from openai.types.completion_usage import CompletionUsage
 from openai.types.chat.chat_completion_message_tool_call import (
@@ -7,8 +9,111 @@ from openai.types.chat.chat_completion_message_tool_call import (
 from typing import Union, Literal, Any, Annotated
 
 
+# Version of the notification schema written by `sdk.exe`. It is reported in
+# the params of `maria.agent.conversation_start`.
+SCHEMA_VERSION = 1
+
+
+class ToolDescription(pydantic.BaseModel):
+    name: str
+    description: str
+    json_schema: Any = pydantic.Field(alias="schema")
+
+
+class ToolAddedParams(pydantic.BaseModel):
+    tool: ToolDescription
+
+
+class ToolAdded(pydantic.BaseModel):
+    method: Literal["maria.agent.tool_added"]
+    params: ToolAddedParams
+
+
+class UserMessage(pydantic.BaseModel):
+    role: Literal["user"]
+    content: str
+
+
+class MessageParams(pydantic.BaseModel):
+    message: UserMessage
+
+
+class Message(pydantic.BaseModel):
+    method: Literal["maria.agent.message"]
+    params: MessageParams
+
+
+class ConversationStartParams(pydantic.BaseModel):
+    # Absent for executables predating the versioned schema.
+    version: int | None = None
+
+
+class ConversationStart(pydantic.BaseModel):
+    method: Literal["maria.agent.conversation_start"]
+    params: ConversationStartParams
+
+
+class ConversationEndParams(pydantic.BaseModel):
+    pass
+
+
+class ConversationEnd(pydantic.BaseModel):
+    method: Literal["maria.agent.conversation_end"]
+    params: ConversationEndParams
+
+
+class CancelledParams(pydantic.BaseModel):
+    pass
+
+
+class Cancelled(pydantic.BaseModel):
+    """The prompt was cancelled by a `maria.cancel` control message."""
+
+    method: Literal["maria.agent.cancelled"]
+    params: CancelledParams
+
+
+class TokenCountedParams(pydantic.BaseModel):
+    token_count: int
+
+
+class TokenCounted(pydantic.BaseModel):
+    method: Literal["maria.agent.token_counted"]
+    params: TokenCountedParams
+
+
+class ContextPrunedParams(pydantic.BaseModel):
+    origin_token_count: int
+    pruned_token_count: int
+
+
+class ContextPruned(pydantic.BaseModel):
+    method: Literal["maria.agent.context_pruned"]
+    params: ContextPrunedParams
+
+
+class ToolCallDelta(pydantic.BaseModel):
+    index: int
+    id: str | None = None
+    name: str | None = None
+    arguments: str | None = None
+
+
+class DeltaParams(pydantic.BaseModel):
+    content: str | None = None
+    tool_calls: list[ToolCallDelta] = []
+
+
+class Delta(pydantic.BaseModel):
+    """A streamed piece of the assistant message, only sent when streaming is
+    enabled. The complete message follows in `RequestCompleted`."""
+
+    method: Literal["maria.agent.delta"]
+    params: DeltaParams
+
+
 class RequestCompletedParams(pydantic.BaseModel):
-    usage: CompletionUsage
+    usage: CompletionUsage | None
     message: ChatCompletionMessage
 
 
@@ -17,6 +122,15 @@ class RequestCompleted(pydantic.BaseModel):
     params: RequestCompletedParams
 
 
+class PreToolCallParams(pydantic.BaseModel):
+    tool_call: ChatCompletionMessageToolCall
+
+
+class PreToolCall(pydantic.BaseModel):
+    method: Literal["maria.agent.pre_tool_call"]
+    params: PreToolCallParams
+
+
 class PostToolCallParams(pydantic.BaseModel):
     tool_call: ChatCompletionMessageToolCall
     value: Any = pydantic.Field(alias='json')
@@ -28,8 +142,123 @@ class PostToolCall(pydantic.BaseModel):
     params: PostToolCallParams
 
 
+class UnknownNotification(pydantic.BaseModel):
+    """A notification this version of the SDK does not know about. Its params
+    are kept as-is so that newer executables never break older clients."""
+
+    method: str
+    params: Any = None
+
+
+_NOTIFICATIONS: dict[str, type[pydantic.BaseModel]] = {
+    "maria.agent.tool_added": ToolAdded,
+    "maria.agent.message": Message,
+    "maria.agent.conversation_start": ConversationStart,
+    "maria.agent.conversation_end": ConversationEnd,
+    "maria.agent.cancelled": Cancelled,
+    "maria.agent.token_counted": TokenCounted,
+    "maria.agent.context_pruned": ContextPruned,
+    "maria.agent.delta": Delta,
+    "maria.agent.request_completed": RequestCompleted,
+    "maria.agent.pre_tool_call": PreToolCall,
+    "maria.agent.post_tool_call": PostToolCall,
+}
+
+
+def _discriminate(value: Any) -> str:
+    if isinstance(value, dict):
+        method = value.get("method")
+    else:
+        method = getattr(value, "method", None)
+    return method if method in _NOTIFICATIONS else "unknown"
+
+
 Notification = Annotated[
-    Union[RequestCompleted, PostToolCall], pydantic.Field(discriminator="method")
+    Union[
+        Annotated[ToolAdded, pydantic.Tag("maria.agent.tool_added")],
+        Annotated[Message, pydantic.Tag("maria.agent.message")],
+        Annotated[ConversationStart, pydantic.Tag("maria.agent.conversation_start")],
+        Annotated[ConversationEnd, pydantic.Tag("maria.agent.conversation_end")],
+        Annotated[Cancelled, pydantic.Tag("maria.agent.cancelled")],
+        Annotated[TokenCounted, pydantic.Tag("maria.agent.token_counted")],
+        Annotated[ContextPruned, pydantic.Tag("maria.agent.context_pruned")],
+        Annotated[Delta, pydantic.Tag("maria.agent.delta")],
+        Annotated[RequestCompleted, pydantic.Tag("maria.agent.request_completed")],
+        Annotated[PreToolCall, pydantic.Tag("maria.agent.pre_tool_call")],
+        Annotated[PostToolCall, pydantic.Tag("maria.agent.post_tool_call")],
+        Annotated[UnknownNotification, pydantic.Tag("unknown")],
+    ],
+    pydantic.Discriminator(_discriminate),
 ]
 
 notification = pydantic.TypeAdapter(Notification)
+
+
+_METHOD = re.compile(rb'\s*\{\s*"method"\s*:\s*"([^"\\]*)"')
+
+
+def peek_method(line: bytes) -> str | None:
+    """Returns the `method` of a notification line without parsing it.
+
+    `sdk.exe` always writes `method` as the first key of a notification, so
+    this only scans the head of the line. `None` is returned for anything else
+    (responses, or notifications written in a different key order)."""
+    match = _METHOD.match(line)
+    return match.group(1).decode() if match is not None else None
+
+
+class LazyNotification:
+    """A notification that is validated only when needed.
+
+    `method` is read with `peek_method`, `raw` is the line as written by
+    `sdk.exe`, and `data` is the result of a plain `json.loads`, with `params`
+    its plain `"params"` dict. The pydantic `Notification` is built on first
+    access to `model`; its fields are reached through `model.params...`, or
+    directly for any attribute other than `raw`, `method`, `data` and `params`.
+
+    A lazy notification is not an instance of its model class, so filtering
+    with `isinstance(event, RequestCompleted)` does not match it; compare
+    `method` or check `isinstance(event.model, RequestCompleted)` instead."""
+
+    __slots__ = ("raw", "_method", "_data", "_model")
+
+    def __init__(self, raw: bytes, method: str | None = None):
+        self.raw = raw
+        self._method = method
+        self._data: dict[str, Any] | None = None
+        self._model: Notification | None = None
+
+    @property
+    def method(self) -> str:
+        if self._method is None:
+            self._method = peek_method(self.raw) or self.data["method"]
+        return self._method
+
+    @property
+    def data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(self.raw)
+        return self._data
+
+    @property
+    def params(self) -> Any:
+        return self.data.get("params")
+
+    @property
+    def model(self) -> Notification:
+        if self._model is None:
+            self._model = notification.validate_json(self.raw)
+        return self._model
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+    def __repr__(self) -> str:
+        return f"LazyNotification(method={self.method!r})"
+
+
+def decode(line: bytes, lazy: bool = False) -> Notification | LazyNotification:
+    """Decodes a notification line, either fully or as a `LazyNotification`."""
+    if lazy:
+        return LazyNotification(line, peek_method(line))
+    return notification.validate_json(line)
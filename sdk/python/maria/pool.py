@@ -0,0 +1,202 @@
+import asyncio
+import os
+import time
+import maria.events
+from maria._executable import executable
+from maria._reader import DEFAULT_HIGH_WATER_MARK
+from maria.batch import Batch
+from maria._worker import Worker
+from pathlib import Path
+from typing import AsyncGenerator, Iterable
+
+
+class MariaPool:
+    """A pool of warm `sdk.exe serve` processes.
+
+    Unlike `Maria.start`, which spawns a new process (and loads the model again)
+    for every prompt, the pool keeps `size` agent processes alive and hands
+    prompts to whichever one is idle.
+
+    - Idle workers are pinged before reuse if they have not been used for
+      `health_check_interval` seconds; unhealthy workers are replaced.
+    - Workers are recycled after serving `max_requests` prompts.
+    - At most `max_queue` callers may wait for a worker; further calls to
+      `start` raise `asyncio.QueueFull` instead of piling up.
+    - `high_water_mark` and `max_line_size` configure how each worker's
+      output is read, as for `Maria`.
+    - A prompt that is cancelled, exceeds its deadline or is abandoned by the
+      caller is cancelled in its worker with `maria.cancel`. The worker is
+      reused if it acknowledges within `cancel_grace_period` seconds, and
+      replaced otherwise.
+
+    ```python
+    async with MariaPool(size=4) as pool:
+        async for event in pool.start("Hello?"):
+            print(event)
+    ```
+    """
+
+    def __init__(
+        self,
+        size: int = os.cpu_count() or 1,
+        max_requests: int = 100,
+        max_queue: int = 1024,
+        health_check_interval: float = 30.0,
+        health_check_timeout: float = 5.0,
+        model: str | None = None,
+        high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+        max_line_size: int | None = None,
+        cancel_grace_period: float = 5.0,
+    ):
+        self.size = size
+        self.max_requests = max_requests
+        self.max_queue = max_queue
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.model = model
+        self.high_water_mark = high_water_mark
+        self.max_line_size = max_line_size
+        self.cancel_grace_period = cancel_grace_period
+        # Idle workers, and `None` for each slot whose worker was retired and
+        # has not been replaced yet. Every slot of the pool is either in the
+        # queue or held by a caller of `start`.
+        self._idle: asyncio.Queue[Worker | None] = asyncio.Queue()
+        self._workers: set[Worker] = set()
+        self._waiting = 0
+        self._executable_path: Path | None = None
+
+    async def __aenter__(self) -> "MariaPool":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        self._executable_path = executable()
+        workers = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+        for worker in workers:
+            self._idle.put_nowait(worker)
+
+    async def close(self) -> None:
+        self._executable_path = None
+        self._idle = asyncio.Queue()
+        workers = list(self._workers)
+        self._workers.clear()
+        await asyncio.gather(*(worker.close() for worker in workers))
+
+    async def _spawn(self) -> Worker:
+        assert self._executable_path is not None, "MariaPool is not open"
+        worker = await Worker.spawn(
+            self._executable_path,
+            model=self.model,
+            high_water_mark=self.high_water_mark,
+            max_line_size=self.max_line_size,
+        )
+        self._workers.add(worker)
+        return worker
+
+    async def _retire(self, worker: Worker) -> None:
+        self._workers.discard(worker)
+        await worker.close()
+
+    async def _healthy(self, worker: Worker) -> bool:
+        if not worker.alive():
+            return False
+        if time.monotonic() - worker.last_used < self.health_check_interval:
+            return True
+        try:
+            async with asyncio.timeout(self.health_check_timeout):
+                await worker.ping()
+            return True
+        except (TimeoutError, RuntimeError, OSError):
+            return False
+
+    async def _acquire(self) -> Worker:
+        assert self._executable_path is not None, "MariaPool is not open"
+        if self._idle.empty() and self._waiting >= self.max_queue:
+            raise asyncio.QueueFull(
+                f"Too many prompts waiting for a Maria worker ({self._waiting})"
+            )
+        self._waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if worker is not None and not await self._healthy(worker):
+            await self._retire(worker)
+            worker = None
+        if worker is None:
+            try:
+                worker = await self._spawn()
+            except BaseException:
+                # Give the slot back, so that the next caller spawns again.
+                self._idle.put_nowait(None)
+                raise
+        return worker
+
+    async def _release(self, worker: Worker, reusable: bool) -> None:
+        worker.requests += 1
+        if worker not in self._workers:
+            # The pool has been closed while the worker was busy.
+            await worker.close()
+            return
+        if not reusable or worker.requests >= self.max_requests:
+            # The replacement is spawned by the next `_acquire`, which raises
+            # to its own caller if spawning fails.
+            self._idle.put_nowait(None)
+            await self._retire(worker)
+            return
+        self._idle.put_nowait(worker)
+
+    async def start(
+        self,
+        prompt: str,
+        lazy: bool = False,
+        stream: bool = False,
+        deadline: float | None = None,
+    ) -> AsyncGenerator[
+        maria.events.Notification | maria.events.LazyNotification, None
+    ]:
+        """Runs `prompt` on an idle worker and yields its notifications. If
+        `deadline` (in terms of `loop.time()`) passes first, the prompt is
+        cancelled and `TimeoutError` is raised."""
+        worker = await self._acquire()
+        reusable = False
+        params = {"prompt": prompt, "stream": stream}
+        lines = worker.call("maria.prompt", params)
+        try:
+            while True:
+                async with asyncio.timeout_at(deadline):
+                    line = await anext(lines, None)
+                if line is None:
+                    break
+                yield maria.events.decode(line, lazy=lazy)
+            reusable = True
+        except RuntimeError:
+            reusable = worker.alive()
+            raise
+        except (asyncio.CancelledError, GeneratorExit, TimeoutError):
+            reusable = await worker.cancel(self.cancel_grace_period)
+            raise
+        finally:
+            await lines.aclose()
+            await self._release(worker, reusable)
+
+    def map(
+        self,
+        prompts: Iterable[str],
+        timeout: float | None = None,
+        ordered: bool = True,
+        token_budget: int | None = None,
+    ) -> Batch:
+        """Runs `prompts` on the pool's workers, one prompt per worker at a
+        time. See `Batch` for the arguments."""
+        return Batch(
+            self.start,
+            prompts,
+            concurrency=self.size,
+            timeout=timeout,
+            ordered=ordered,
+            token_budget=token_budget,
+        )
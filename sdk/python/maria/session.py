@@ -0,0 +1,109 @@
+import asyncio
+import maria.events
+from maria._executable import executable
+from maria._reader import DEFAULT_HIGH_WATER_MARK
+from maria._worker import Worker
+from typing import AsyncGenerator
+
+
+class Session:
+    """A multi-turn conversation with one long-lived agent.
+
+    `Maria.start` and `MariaPool.start` begin a new conversation for every
+    prompt. A session instead keeps one `sdk.exe serve` process and agent
+    alive, and each `send` queues the prompt as a follow-up message of the
+    same conversation. Only the new message is added to the agent's history,
+    so the unchanged prefix of the conversation stays in the model's prompt
+    cache.
+
+    Prompts are sent one at a time; concurrent calls to `send` wait for the
+    previous one to finish. A prompt that is cancelled, exceeds its deadline
+    or is abandoned is cancelled in the agent with `maria.cancel`. If the
+    agent does not acknowledge within `cancel_grace_period` seconds, its
+    process is killed, the conversation is lost and the session is closed.
+
+    ```python
+    async with Session() as session:
+        async for event in session.send("Read README.md."):
+            print(event)
+        async for event in session.send("Now summarize it."):
+            print(event)
+    ```
+    """
+
+    def __init__(
+        self,
+        model: str | None = None,
+        high_water_mark: int = DEFAULT_HIGH_WATER_MARK,
+        max_line_size: int | None = None,
+        cancel_grace_period: float = 5.0,
+    ):
+        self.model = model
+        self.high_water_mark = high_water_mark
+        self.max_line_size = max_line_size
+        self.cancel_grace_period = cancel_grace_period
+        self._worker: Worker | None = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "Session":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        self._worker = await Worker.spawn(
+            executable(),
+            model=self.model,
+            high_water_mark=self.high_water_mark,
+            max_line_size=self.max_line_size,
+        )
+
+    async def close(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            await worker.close()
+
+    def _require_worker(self) -> Worker:
+        if self._worker is None or not self._worker.alive():
+            raise RuntimeError("Session is not open")
+        return self._worker
+
+    async def send(
+        self,
+        prompt: str,
+        lazy: bool = False,
+        stream: bool = False,
+        deadline: float | None = None,
+    ) -> AsyncGenerator[
+        maria.events.Notification | maria.events.LazyNotification, None
+    ]:
+        """Sends `prompt` as the next message of the conversation and yields
+        the notifications it produces. If `deadline` (in terms of
+        `loop.time()`) passes first, the prompt is cancelled and
+        `TimeoutError` is raised."""
+        async with self._lock:
+            worker = self._require_worker()
+            params = {"prompt": prompt, "stream": stream, "session": True}
+            lines = worker.call("maria.prompt", params)
+            try:
+                while True:
+                    async with asyncio.timeout_at(deadline):
+                        line = await anext(lines, None)
+                    if line is None:
+                        break
+                    yield maria.events.decode(line, lazy=lazy)
+            except (asyncio.CancelledError, GeneratorExit, TimeoutError):
+                if not await worker.cancel(self.cancel_grace_period):
+                    await self.close()
+                raise
+            finally:
+                await lines.aclose()
+
+    async def reset(self) -> None:
+        """Discards the conversation, so that the next `send` starts a new
+        one in the same process."""
+        async with self._lock:
+            async for _ in self._require_worker().call("maria.reset"):
+                pass
@@ -0,0 +1,42 @@
+import asyncio
+import contextlib
+import maria.events
+from maria.batch import Batch
+from typing import AsyncIterator
+
+
+def test_break_stops_starting_prompts() -> None:
+    started: list[str] = []
+
+    async def start(prompt: str) -> AsyncIterator[maria.events.Notification]:
+        started.append(prompt)
+        await asyncio.sleep(0.01)
+        return
+        yield
+
+    async def main() -> None:
+        batch = Batch(start, (str(i) for i in range(100)), concurrency=2)
+        async with contextlib.aclosing(aiter(batch)) as results:
+            async for result in results:
+                assert result.index == 0
+                assert result.error is None
+                break
+        count = len(started)
+        await asyncio.sleep(0.1)
+        assert len(started) == count
+        assert count < 100
+
+    asyncio.run(main())
+
+
+def test_yields_every_prompt_in_order() -> None:
+    async def start(prompt: str) -> AsyncIterator[maria.events.Notification]:
+        await asyncio.sleep(0.01 * (3 - int(prompt)))
+        return
+        yield
+
+    async def main() -> list[str]:
+        batch = Batch(start, ["0", "1", "2"], concurrency=3)
+        return [result.prompt async for result in batch]
+
+    assert asyncio.run(main()) == ["0", "1", "2"]